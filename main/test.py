@@ -1,16 +1,53 @@
 import pygame
-import cv2
-import mediapipe as mp
 import numpy as np
 import random
 from pygame.locals import *
 import os
+import threading
+import time
+import hashlib
+from collections import namedtuple
+from itertools import accumulate
+from types import SimpleNamespace
+
+# OpenCV和mediapipe只在使用摄像头时才加载
+cv2 = None
+mp = None
+
+def import_vision():
+    """Import OpenCV and MediaPipe on first use"""
+    global cv2, mp
+    if cv2 is None:
+        import cv2 as _cv2
+        import mediapipe as _mp
+        cv2, mp = _cv2, _mp
 
 class GameConfig:
     # Window settings
     WINDOW_WIDTH = 800
     WINDOW_HEIGHT = 600
-    FPS = 60
+    FPS = 60  # 固定的模拟频率，所有按帧计的速度和计时器都以它为单位
+    VSYNC = False  # 垂直同步只能通过pygame的SCALED渲染器实现，大屏幕上窗口会被整数倍放大
+    RENDER_FPS_LIMIT = None  # 渲染帧率上限，None表示跟随显示器刷新率，0表示不限制
+    DEFAULT_REFRESH_RATE = 60  # 查询不到显示器刷新率时按这个值限制
+    MAX_FRAME_TIME = 0.25  # 单帧最多补多少秒的模拟
+    MAX_UPDATES_PER_FRAME = 5
+
+    # Headless simulation: no window, audio or camera
+    HEADLESS_INPUT = 'script'  # 无头模式只能用不依赖设备的输入：'script'、'bot'、'replay'或'intents'
+
+    # Deterministic runs
+    RANDOM_SEED = None  # None表示每局随机选种子
+    INPUT_LOG_PATH = None  # 逐帧记录输入意图，配合种子可逐位复现整局
+    INPUT_REPLAY_PATH = None
+
+    # Balance simulator: many headless games played by a bot, across a grid of config values
+    BOT_SPEED = 12  # 机器人每帧最多移动的像素，模拟手的速度
+    BOT_LOOKAHEAD = 60  # 只躲避这么多帧内会到达的敌人
+    BOT_SAFETY_MARGIN = 10
+    BALANCE_GAMES = 200  # 每组配置的局数
+    BALANCE_MAX_TICKS = 5 * 60 * 60  # 单局最多模拟5分钟
+    BALANCE_WORKERS = None  # None表示使用全部CPU核心
     
     # Player settings
     BIRD_START_HEALTH = 100
@@ -84,6 +121,13 @@ class GameConfig:
         'heavily_damaged': 'Animation/Effects/Heavily_Damaged_Background.PNG'
     }
 
+    # 背景图片缺失或低画质时使用的纯色
+    BACKGROUND_COLORS = {
+        'healthy': (135, 206, 235),
+        'slight_damage': (170, 170, 170),
+        'heavily_damaged': (139, 69, 19)
+    }
+
     POWER_UP_ICONS = {
         'health': 'Animation/Effects/Recovery_Icon.PNG',
         'rapid_fire': 'Animation/Effects/Rapid_Shot_Icon.PNG',
@@ -133,6 +177,50 @@ class GameConfig:
     }
     MIN_SPAWN_INTERVAL = 30
     SPEED_INCREASE_PER_LEVEL = 0.05  # 5% speed increase per level
+    ENEMY_BASE_SPEED = {
+        'normal': 5,
+        'fast': 8,
+        'large': 5
+    }
+    # 碰撞半径，图片大小的一半
+    ENEMY_RADII = {
+        'normal': 35,
+        'fast': 30,
+        'large': 36
+    }
+    ENEMY_HEALTH = {
+        'normal': 1,
+        'fast': 1,
+        'large': 3
+    }
+    PROGRESSION_EXPORT_LEVELS = 40  # 导出进度表时默认列出的等级数
+
+    # 碰撞盒
+    BULLET_RADIUS = 15
+    BULLET_SPEED = 10
+    BULLET_SPREAD_ANGLES = (-30, -15, 0, 15, 30)  # 三连发和散射用到的全部角度
+    BOSS_HITBOX_SIZE = (72, 120)  # Boss使用矩形碰撞盒
+    BIRD_RADIUS = 45  # 图片大小的一半
+    POWER_UP_RADIUS = 10
+    GRID_CELL_SIZE = 64  # 碰撞网格的格子边长
+    # 像素级碰撞：按精灵图的不透明像素判定，关闭时使用上面的圆形和矩形碰撞盒
+    PIXEL_COLLISIONS = True
+    MASK_ALPHA_THRESHOLD = 127
+    SPRITE_SIZES = {
+        'bird': (90, 90),
+        'bullet': (30, 30),
+        'power_up': (70, 70),
+        'normal': (70, 70),
+        'fast': (60, 60),
+        'large': (72, 120)
+    }
+
+    # 实体数组的初始容量，满了自动翻倍
+    ENTITY_CAPACITY = {
+        'bullets': 256,
+        'pollution': 64,
+        'power_ups': 16
+    }
     
     # 新添加的Enhanced power up settings
     POWER_UP_BASE_INTERVAL = 900
@@ -148,6 +236,2122 @@ class GameConfig:
 
     HIGHSCORE_FILE = "highscore.txt"
 
+    # Hand tracking settings
+    CAMERA_FRAME_SIZE = (320, 240)
+    CAMERA_FPS = 30
+    CAMERA_FOURCCS = ('MJPG', 'YUYV')  # 按顺序尝试
+    CAMERA_BUFFER_SIZE = 1  # 驱动队列只保留最新帧
+    FRAME_SOURCE = 0  # 摄像头编号、视频文件、图片目录或 'synthetic'
+    FRAME_SOURCE_REALTIME = True  # False: 不限速、不丢帧地回放，用于性能分析
+    HAND_INFERENCE_PROCESS = True  # 在独立进程中运行mediapipe
+    FRAME_RING_SLOTS = 3
+    WORKER_CHECK_INTERVAL = 30  # 每30帧检查一次推理进程是否存活
+
+    # Region-of-interest tracking: infer on a crop around the last hands
+    ROI_TRACKING = False
+    ROI_MARGIN = 0.5  # 框在手的包围盒每边扩大50%
+    ROI_MIN_SIZE = 96
+    ROI_FULL_FRAME_INTERVAL = 15  # 每15次推理用整帧检测一次新出现的手
+    HAND_SERVER_NAME = 'bird_hands'  # 共享手势服务的共享内存名
+    HAND_MODEL = 'mediapipe'  # 'marker'只识别合成源里的圆盘，用于延迟测试
+
+    # Camera-to-photon latency test
+    LATENCY_TEST = False
+    LATENCY_TEST_SECONDS = 20
+    LATENCY_REPORT_PATH = None
+
+    # Hand preview overlay (toggle with H)
+    HAND_PREVIEW_ENABLED = False
+    HAND_PREVIEW_INTERVAL = 4  # 每4帧刷新一次预览
+    HAND_PREVIEW_POS = (WINDOW_WIDTH - 330, WINDOW_HEIGHT - 250)
+
+    # Inference frequency
+    INFERENCE_INTERVAL = 1  # 每N帧推理一次
+    INFERENCE_ADAPTIVE = False  # 根据实测推理耗时自动调整N
+    INFERENCE_BUDGET_MS = 6  # 自适应模式下每帧分摊的推理预算
+    MAX_INFERENCE_INTERVAL = 6
+    MAX_EXTRAPOLATION_TICKS = 10
+    PINCH_THRESHOLD = 0.05  # 拇指与食指指尖的归一化距离
+
+    # Landmark recording and replay
+    LANDMARK_RECORD_PATH = None
+    LANDMARK_RECORD_PRECISION = 'float16'  # 或 'float32'
+    LANDMARK_REPLAY_PATH = None
+    LANDMARK_FILE_EXTENSION = '.lmk'
+
+    # Vision pipeline metrics (toggle the overlay with M)
+    VISION_METRICS_WINDOW = 600  # 每项统计保留最近600个样本
+    VISION_METRICS_OVERLAY = False
+    VISION_METRICS_PATH = None  # 退出时写入JSON
+
+    # Bird movement filter: 'one_euro' or 'lerp'
+    MOVEMENT_FILTER = 'one_euro'
+    LERP_ALPHA = 0.15
+    ONE_EURO_MIN_CUTOFF = 1.0
+    ONE_EURO_BETA = 0.01
+    ONE_EURO_D_CUTOFF = 1.0
+
+    # Input backends: 'camera', 'keyboard', 'mouse' or 'gamepad' (F1-F4 to switch)
+    INPUT_BACKEND = 'camera'
+    INPUT_SWITCH_KEYS = {K_F1: 'keyboard', K_F2: 'mouse', K_F3: 'gamepad', K_F4: 'camera'}
+    KEYBOARD_SPEED = 6
+    GAMEPAD_DEADZONE = 0.2
+    GAMEPAD_SHOOT_BUTTONS = (0, 5)
+
+    # Quality governor
+    QUALITY_GOVERNOR_ENABLED = True
+    QUALITY_WINDOW = 120  # 统计最近120帧
+    QUALITY_CHECK_INTERVAL = 30
+    QUALITY_DEGRADE_RATIO = 0.9  # p90超过预算的90%就降级
+    QUALITY_UPGRADE_RATIO = 0.5  # p90低于预算的50%才考虑升级
+    QUALITY_UPGRADE_HOLD = 600  # 升级前至少保持10秒
+    QUALITY_LEVELS = [
+        {'name': 'high', 'model_complexity': 1, 'camera_size': (320, 240), 'inference_interval': 1,
+         'hand_preview': True, 'max_impact_animations': 32, 'background': 'image'},
+        {'name': 'medium', 'model_complexity': 0, 'camera_size': (320, 240), 'inference_interval': 1,
+         'hand_preview': True, 'max_impact_animations': 16, 'background': 'image'},
+        {'name': 'low', 'model_complexity': 0, 'camera_size': (320, 240), 'inference_interval': 2,
+         'hand_preview': False, 'max_impact_animations': 8, 'background': 'image'},
+        {'name': 'minimal', 'model_complexity': 0, 'camera_size': (256, 192), 'inference_interval': 3,
+         'hand_preview': False, 'max_impact_animations': 4, 'background': 'solid'},
+    ]
+    QUALITY_START_LEVEL = 1  # 'medium' 与原来的默认设置一致
+
+class CameraCapture:
+    """Background capture thread publishing only the newest frame"""
+    def __init__(self, cap):
+        self.cap = cap
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frame_time = None  # 最近一次read()取到的帧的采集时间
+        self._frame = None
+        self._frame_time = None
+        self._lock = threading.Lock()
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._thread.start()
+
+    def _capture_loop(self):
+        while self._running:
+            ret, frame = self.cap.read()
+            if not ret:
+                time.sleep(0.005)  # 避免摄像头断开时空转
+                continue
+            with self._lock:
+                # 单槽邮箱：未被取走的旧帧直接丢弃
+                if self._frame is not None:
+                    self.frames_dropped += 1
+                self._frame = frame
+                self._frame_time = time.perf_counter()
+                self.frames_captured += 1
+
+    def read(self):
+        """Take the newest frame without blocking, (False, None) if none arrived"""
+        with self._lock:
+            frame = self._frame
+            self._frame = None
+            if frame is not None:
+                self.frame_time = self._frame_time
+        return frame is not None, frame
+
+    def release(self):
+        self._running = False
+        self._thread.join(timeout=1.0)
+        self.cap.release()
+
+HAND_LABELS = ('Left', 'Right')
+MAX_HANDS = 2
+NUM_LANDMARKS = 21
+
+def hands_from_results(results):
+    """Convert a mediapipe result into a list of (label, landmarks[21, 3], score) tuples"""
+    hands = []
+    if results.multi_hand_landmarks:
+        for hand_landmarks, handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
+            landmarks = np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark],
+                                 dtype=np.float32)
+            classification = handedness.classification[0]
+            hands.append((classification.label, landmarks, classification.score))
+    return hands
+
+class HandRoi:
+    """Crop the inference input to an enlarged box around the last detected hands
+
+    Landmarks found in the crop are mapped back to full-frame normalized
+    coordinates. The box only moves when the hands get close to its edge, so
+    mediapipe's own frame-to-frame tracking sees a stable image. Losing a hand,
+    or every full_frame_interval inferences, falls back to the full frame so
+    hands entering elsewhere are still found.
+    """
+    def __init__(self, margin=0.5, min_size=96, full_frame_interval=15):
+        self.margin = margin
+        self.min_size = min_size
+        self.full_frame_interval = full_frame_interval
+        self.box = None
+        self.hand_count = 0
+        self.since_full_frame = 0
+
+    def process(self, model, frame):
+        height, width = frame.shape[:2]
+        use_roi = self.box is not None and self.since_full_frame < self.full_frame_interval
+        if use_roi:
+            x0, y0, x1, y1 = self.box
+            crop = np.ascontiguousarray(frame[y0:y1, x0:x1])
+            hands = hands_from_results(model.process(crop))
+            for _, landmarks, _ in hands:
+                landmarks[:, 0] = (x0 + landmarks[:, 0] * (x1 - x0)) / width
+                landmarks[:, 1] = (y0 + landmarks[:, 1] * (y1 - y0)) / height
+            self.since_full_frame += 1
+            # 丢失了手就立即用整帧重新检测
+            use_roi = len(hands) >= self.hand_count
+        if not use_roi:
+            hands = hands_from_results(model.process(frame))
+            self.since_full_frame = 0
+            self.box = None
+        self.hand_count = len(hands)
+        self.update_box(hands, width, height)
+        return hands
+
+    def update_box(self, hands, width, height):
+        if not hands:
+            self.box = None
+            return
+        points = np.concatenate([landmarks[:, :2] for _, landmarks, _ in hands])
+        left, top = points.min(axis=0) * (width, height)
+        right, bottom = points.max(axis=0) * (width, height)
+        if self.box is not None:
+            # 手仍在当前框的内部区域时不移动框
+            x0, y0, x1, y1 = self.box
+            slack = 0.1 * max(x1 - x0, y1 - y0)
+            if (left >= x0 + slack and top >= y0 + slack and
+                    right <= x1 - slack and bottom <= y1 - slack):
+                return
+        size = max(right - left, bottom - top) * (1 + 2 * self.margin)
+        size = max(size, self.min_size)
+        cx, cy = (left + right) / 2, (top + bottom) / 2
+        x0 = int(max(0, cx - size / 2))
+        y0 = int(max(0, cy - size / 2))
+        x1 = int(min(width, cx + size / 2))
+        y1 = int(min(height, cy + size / 2))
+        self.box = (x0, y0, x1, y1) if x1 - x0 >= 16 and y1 - y0 >= 16 else None
+
+def create_hand_roi(enabled):
+    if not enabled:
+        return None
+    return HandRoi(GameConfig.ROI_MARGIN, GameConfig.ROI_MIN_SIZE, GameConfig.ROI_FULL_FRAME_INTERVAL)
+
+def detect_hands(model, frame, roi=None):
+    """Run the hand model on a frame, through the ROI tracker when one is given"""
+    if roi is None:
+        return hands_from_results(model.process(frame))
+    return roi.process(model, frame)
+
+class MarkerHandModel:
+    """Stand-in for mediapipe Hands in the latency test: reports the synthetic disc as a right hand"""
+    def process(self, frame):
+        # 合成圆盘偏红，灰色背景的R和B相等
+        mask = frame[:, :, 0].astype(np.int16) - frame[:, :, 2] > 60
+        ys, xs = np.nonzero(mask)
+        if not len(xs):
+            return SimpleNamespace(multi_hand_landmarks=None, multi_handedness=None)
+        height, width = mask.shape
+        tip = SimpleNamespace(x=xs.mean() / width, y=ys.mean() / height, z=0.0)
+        return SimpleNamespace(
+            multi_hand_landmarks=[SimpleNamespace(landmark=[tip] * NUM_LANDMARKS)],
+            multi_handedness=[SimpleNamespace(classification=[SimpleNamespace(label='Right', score=1.0)])],
+        )
+
+    def close(self):
+        pass
+
+def create_hand_model(hands_options):
+    """mediapipe Hands, or the marker detector when hands_options asks for it"""
+    options = dict(hands_options)
+    if options.pop('marker', False):
+        return MarkerHandModel()
+    import_vision()
+    return mp.solutions.hands.Hands(**options)
+
+def _hand_state_views(buf):
+    """Map the shared state block: control words, per-hand label, score and landmarks"""
+    ctrl = np.ndarray((8,), dtype=np.int64, buffer=buf, offset=0)
+    labels = np.ndarray((MAX_HANDS,), dtype=np.int64, buffer=buf, offset=64)
+    scores = np.ndarray((MAX_HANDS,), dtype=np.float32, buffer=buf, offset=64 + 8 * MAX_HANDS)
+    landmarks = np.ndarray((MAX_HANDS, NUM_LANDMARKS, 3), dtype=np.float32,
+                           buffer=buf, offset=64 + 12 * MAX_HANDS)
+    return ctrl, labels, scores, landmarks
+
+# 控制字下标
+CTRL_FRAME_SEQ = 0      # 最新帧序号
+CTRL_FRAME_SLOT = 1     # 最新帧所在槽位
+CTRL_READING_SLOT = 2   # 推理进程正在读取的槽位
+CTRL_RESULT_SEQ = 3     # 结果序号
+CTRL_RESULT_FRAME = 4   # 结果对应的帧序号
+CTRL_NUM_HANDS = 5
+CTRL_INFERENCE_US = 6   # 最近一次推理耗时（微秒）
+HAND_STATE_SIZE = 64 + 12 * MAX_HANDS + 4 * MAX_HANDS * NUM_LANDMARKS * 3
+
+def _attach_shared_memory(name, owned_by_parent=False):
+    """Attach to an existing block without letting this process unlink it on exit
+
+    Children started by multiprocessing share their parent's resource_tracker;
+    for a block the parent created, the registration is the parent's and must
+    be left in place.
+    """
+    from multiprocessing import resource_tracker, shared_memory
+    shm = shared_memory.SharedMemory(name=name)
+    if not owned_by_parent:
+        # Python 3.12及以前attach也会被resource_tracker登记，退出时会误删服务端的内存
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+def _hand_inference_worker(ring_name, state_name, ring_shape, lock, frame_ready, stop_event,
+                           hands_options, roi_enabled=False):
+    """Inference process: read the newest ring slot in place, write landmarks back"""
+    import signal
+    # 由父进程通过stop_event控制退出，Ctrl+C只交给父进程处理，terminate()保持默认行为
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    ring_shm = _attach_shared_memory(ring_name, owned_by_parent=True)
+    state_shm = _attach_shared_memory(state_name, owned_by_parent=True)
+    ring = np.ndarray(ring_shape, dtype=np.uint8, buffer=ring_shm.buf)
+    ctrl, labels, scores, landmarks = _hand_state_views(state_shm.buf)
+    hands = create_hand_model(hands_options)
+    roi = create_hand_roi(roi_enabled)
+    last_seq = -1
+    try:
+        while not stop_event.is_set():
+            if not frame_ready.wait(0.1):
+                continue
+            frame_ready.clear()
+            with lock:
+                seq = int(ctrl[CTRL_FRAME_SEQ])
+                slot = int(ctrl[CTRL_FRAME_SLOT])
+                if seq == last_seq or slot < 0:
+                    continue
+                ctrl[CTRL_READING_SLOT] = slot
+            # 直接在共享内存上推理，不复制帧
+            start = time.perf_counter()
+            detected = detect_hands(hands, ring[slot], roi)[:MAX_HANDS]
+            elapsed_us = int((time.perf_counter() - start) * 1e6)
+            with lock:
+                ctrl[CTRL_INFERENCE_US] = elapsed_us
+                ctrl[CTRL_READING_SLOT] = -1
+                for i, (label, points, score) in enumerate(detected):
+                    labels[i] = HAND_LABELS.index(label)
+                    scores[i] = score
+                    landmarks[i] = points
+                ctrl[CTRL_NUM_HANDS] = len(detected)
+                ctrl[CTRL_RESULT_FRAME] = seq
+                ctrl[CTRL_RESULT_SEQ] += 1
+            last_seq = seq
+    finally:
+        hands.close()
+        del ring, ctrl, labels, scores, landmarks
+        ring_shm.close()
+        state_shm.close()
+
+LANDMARK_FILE_MAGIC = b'BIRDLMK2'
+# 第1版的记录没有scores字段，大小不同，无法按新格式读取
+OLD_LANDMARK_FILE_MAGICS = (b'BIRDLMK1',)
+
+def landmark_record_dtype(precision='float16'):
+    """One record per inference result: tick, seconds, hand count, handedness, scores, landmarks"""
+    return np.dtype([
+        ('tick', '<u4'),
+        ('time', '<f8'),
+        ('num_hands', 'u1'),
+        ('labels', 'u1', (MAX_HANDS,)),
+        ('scores', '<f2', (MAX_HANDS,)),
+        ('landmarks', np.dtype(precision).newbyteorder('<'), (MAX_HANDS, NUM_LANDMARKS, 3)),
+    ])
+
+class LandmarkRecorder:
+    """Append hand-tracking results to a compact binary file
+
+    Layout: 8-byte magic, 1-byte precision (2 = float16, 4 = float32), then
+    fixed-size records of landmark_record_dtype, about 270 bytes each at float16.
+    """
+    FLUSH_EVERY = 256
+
+    def __init__(self, path, precision='float16'):
+        self.dtype = landmark_record_dtype(precision)
+        self.file = open(path, 'wb')
+        self.file.write(LANDMARK_FILE_MAGIC)
+        self.file.write(bytes([np.dtype(precision).itemsize]))
+        self.buffer = np.zeros(self.FLUSH_EVERY, dtype=self.dtype)
+        self.count = 0
+        self.start_time = time.perf_counter()
+
+    def write(self, tick, hands):
+        record = self.buffer[self.count]
+        record['tick'] = tick
+        record['time'] = time.perf_counter() - self.start_time
+        record['num_hands'] = min(len(hands), MAX_HANDS)
+        for i, (label, landmarks, score) in enumerate(hands[:MAX_HANDS]):
+            record['labels'][i] = HAND_LABELS.index(label)
+            record['scores'][i] = score
+            record['landmarks'][i] = landmarks
+        self.count += 1
+        if self.count == self.FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        self.buffer[:self.count].tofile(self.file)
+        self.buffer[:self.count] = 0
+        self.count = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+def load_landmark_recording(path):
+    with open(path, 'rb') as f:
+        magic = f.read(len(LANDMARK_FILE_MAGIC))
+        if magic in OLD_LANDMARK_FILE_MAGICS:
+            raise ValueError(f"{path} is a landmark recording from an older version "
+                             f"(format {magic.decode()}), record it again")
+        if magic != LANDMARK_FILE_MAGIC:
+            raise ValueError(f"{path} is not a landmark recording")
+        precision = {2: 'float16', 4: 'float32'}[f.read(1)[0]]
+        return np.fromfile(f, dtype=landmark_record_dtype(precision))
+
+def mirror_to_rgb(frame, dst, resize_buffer):
+    """Mirror, resize and convert BGR to RGB into dst in as few passes as possible"""
+    # 驱动已按320x240输出时跳过缩放
+    if frame.shape[:2] != dst.shape[:2]:
+        frame = cv2.resize(frame, (dst.shape[1], dst.shape[0]), dst=resize_buffer,
+                           interpolation=cv2.INTER_AREA)
+    # 水平翻转和BGR->RGB合并为一次拷贝
+    np.copyto(dst, frame[:, ::-1, ::-1])
+
+class LocalHandTracker:
+    """Run mediapipe in the game process, same interface as HandInferenceWorker"""
+    def __init__(self, frame_size, roi_enabled=False, **hands_options):
+        width, height = frame_size
+        self.hands = create_hand_model(hands_options)
+        self.roi = create_hand_roi(roi_enabled)
+        self._frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self._result_seq = 0
+        self._hands = []
+        self.inference_time = 0.0
+
+    def acquire_slot(self):
+        return 0, self._frame
+
+    def publish_slot(self, slot):
+        start = time.perf_counter()
+        self._hands = detect_hands(self.hands, self._frame, self.roi)
+        self.inference_time = time.perf_counter() - start
+        self._result_seq += 1
+        return self._result_seq
+
+    @property
+    def result_frame(self):
+        return self._result_seq
+
+    def latest(self):
+        return self._result_seq, self._hands
+
+    def close(self):
+        self.hands.close()
+
+class HandInferenceWorker:
+    """Hand inference in a child process fed through a shared-memory frame ring"""
+    RESTART_DELAY = 1.0  # 崩溃后至少间隔1秒再重启
+
+    def __init__(self, frame_size, slots=3, roi_enabled=False, **hands_options):
+        from multiprocessing import shared_memory
+        width, height = frame_size
+        self.hands_options = hands_options
+        self.roi_enabled = roi_enabled
+        self.ring_shape = (max(3, slots), height, width, 3)
+        self.ring_shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.ring_shape)))
+        self.state_shm = shared_memory.SharedMemory(create=True, size=HAND_STATE_SIZE)
+        self.ring = np.ndarray(self.ring_shape, dtype=np.uint8, buffer=self.ring_shm.buf)
+        self.ctrl, self.labels, self.scores, self.landmarks = _hand_state_views(self.state_shm.buf)
+        self.ctrl[:] = 0
+        self.ctrl[CTRL_FRAME_SLOT] = -1
+        self.ctrl[CTRL_READING_SLOT] = -1
+        self.restarts = 0
+        self.process = None
+        self._last_start = 0.0
+        self._result_seq = 0
+        self._result_frame = 0
+        self._hands = []
+        self.start()
+
+    def start(self):
+        import multiprocessing
+        # 用spawn启动全新的解释器：fork会继承pygame的信号处理和正在运行的采集线程
+        context = multiprocessing.get_context('spawn')
+        # 每次启动都换新锁，防止崩溃的进程一直持有旧锁
+        self.lock = context.Lock()
+        self.frame_ready = context.Event()
+        self.stop_event = context.Event()
+        self.ctrl[CTRL_READING_SLOT] = -1
+        self.process = context.Process(
+            target=_hand_inference_worker,
+            args=(self.ring_shm.name, self.state_shm.name, self.ring_shape, self.lock,
+                  self.frame_ready, self.stop_event, self.hands_options, self.roi_enabled),
+            daemon=True
+        )
+        self.process.start()
+        self._last_start = time.monotonic()
+
+    def check_alive(self):
+        """Restart the worker if it died"""
+        if self.process.is_alive():
+            return True
+        if time.monotonic() - self._last_start >= self.RESTART_DELAY:
+            print(f"Hand inference worker exited ({self.process.exitcode}), restarting")
+            self.restarts += 1
+            self.start()
+        return False
+
+    def acquire_slot(self):
+        """Return a ring slot that the worker is not reading, to write the next frame into"""
+        with self.lock:
+            busy = (self.ctrl[CTRL_FRAME_SLOT], self.ctrl[CTRL_READING_SLOT])
+        slot = next(i for i in range(self.ring_shape[0]) if i not in busy)
+        return slot, self.ring[slot]
+
+    def publish_slot(self, slot):
+        with self.lock:
+            self.ctrl[CTRL_FRAME_SLOT] = slot
+            self.ctrl[CTRL_FRAME_SEQ] += 1
+            frame_seq = int(self.ctrl[CTRL_FRAME_SEQ])
+        self.frame_ready.set()
+        return frame_seq
+
+    def latest(self):
+        """Latest (result_seq, hands); only copies when the worker wrote something new"""
+        if self.ctrl[CTRL_RESULT_SEQ] != self._result_seq:
+            with self.lock:
+                self._result_seq = int(self.ctrl[CTRL_RESULT_SEQ])
+                self._result_frame = int(self.ctrl[CTRL_RESULT_FRAME])
+                self._hands = [
+                    (HAND_LABELS[self.labels[i]], self.landmarks[i].copy(), float(self.scores[i]))
+                    for i in range(int(self.ctrl[CTRL_NUM_HANDS]))
+                ]
+        return self._result_seq, self._hands
+
+    @property
+    def result_frame(self):
+        """Frame sequence number the latest result was computed from"""
+        return self._result_frame
+
+    @property
+    def inference_time(self):
+        return self.ctrl[CTRL_INFERENCE_US] / 1e6
+
+    def close(self):
+        # 已经退出的进程可能死在事件的内部锁里，再set会永远阻塞
+        if self.process.is_alive():
+            self.stop_event.set()
+            self.frame_ready.set()
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            print("Hand inference worker did not stop, killing it")
+            self.process.kill()
+            self.process.join(timeout=1.0)
+        del self.ring, self.ctrl, self.labels, self.scores, self.landmarks
+        for shm in (self.ring_shm, self.state_shm):
+            shm.close()
+            shm.unlink()
+
+CTRL_SERVER_PID = 7     # 手势服务进程号，0表示未运行
+
+def _process_alive(pid):
+    """Whether a process with this pid exists; pid 0 means none"""
+    if pid == 0:
+        return False
+    if os.name == 'nt':
+        # Windows上os.kill(pid, 0)会结束进程，只能相信服务退出时清零的pid
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class HandTrackingServer:
+    """Own the camera and the hand model, publish landmarks to a named shared-memory block
+
+    Clients map the block read-only and pay no inference cost. RESULT_SEQ works
+    as a seqlock: it is odd while a result is being written.
+    """
+    def __init__(self, name, source, frame_size, roi_enabled=False, **hands_options):
+        from multiprocessing import shared_memory
+        self.name = name
+        self.source = source
+        self.frame_size = tuple(frame_size)
+        width, height = self.frame_size
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self.resize_buffer = np.empty_like(self.frame)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=HAND_STATE_SIZE)
+        except FileExistsError:
+            # 可能是崩溃的服务留下的内存块：服务还在运行就报错，否则删掉重建
+            stale = shared_memory.SharedMemory(name=name)
+            pid = int(_hand_state_views(stale.buf)[0][CTRL_SERVER_PID])
+            if _process_alive(pid):
+                stale.close()
+                raise RuntimeError(f"Hand tracking server '{name}' is already running (pid {pid})")
+            print(f"Removing stale shared memory '{name}' left by a stopped server")
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=HAND_STATE_SIZE)
+        self.ctrl, self.labels, self.scores, self.landmarks = _hand_state_views(self.shm.buf)
+        self.hands = create_hand_model(hands_options)
+        self.roi = create_hand_roi(roi_enabled)
+        self.ctrl[:] = 0
+        self.ctrl[CTRL_SERVER_PID] = os.getpid()
+
+    def publish(self, frame_seq, detected, elapsed_us):
+        ctrl = self.ctrl
+        ctrl[CTRL_RESULT_SEQ] += 1
+        for i, (label, points, score) in enumerate(detected):
+            self.labels[i] = HAND_LABELS.index(label)
+            self.scores[i] = score
+            self.landmarks[i] = points
+        ctrl[CTRL_NUM_HANDS] = len(detected)
+        ctrl[CTRL_INFERENCE_US] = elapsed_us
+        ctrl[CTRL_RESULT_FRAME] = frame_seq
+        ctrl[CTRL_RESULT_SEQ] += 1
+
+    def run(self):
+        frame_seq = 0
+        while True:
+            ret, frame = self.source.read()
+            if not ret:
+                time.sleep(0.005)
+                continue
+            frame_seq += 1
+            self.ctrl[CTRL_FRAME_SEQ] = frame_seq
+            mirror_to_rgb(frame, self.frame, self.resize_buffer)
+            start = time.perf_counter()
+            detected = detect_hands(self.hands, self.frame, self.roi)[:MAX_HANDS]
+            self.publish(frame_seq, detected, int((time.perf_counter() - start) * 1e6))
+
+    def close(self):
+        self.ctrl[CTRL_SERVER_PID] = 0
+        self.hands.close()
+        self.source.release()
+        del self.ctrl, self.labels, self.scores, self.landmarks
+        self.shm.close()
+        self.shm.unlink()
+
+def run_hand_server(name=None):
+    """Serve hand landmarks from GameConfig.FRAME_SOURCE until interrupted"""
+    import_vision()
+    name = name or GameConfig.HAND_SERVER_NAME
+    quality = GameConfig.QUALITY_LEVELS[GameConfig.QUALITY_START_LEVEL]
+    frame_size = tuple(quality['camera_size'])
+    source = open_frame_source(GameConfig.FRAME_SOURCE, GameConfig.FRAME_SOURCE_REALTIME, frame_size)
+    try:
+        server = HandTrackingServer(name, source, frame_size, GameConfig.ROI_TRACKING,
+                                    max_num_hands=2,
+                                    min_detection_confidence=0.5,
+                                    min_tracking_confidence=0.5,
+                                    model_complexity=quality['model_complexity'],
+                                    marker=GameConfig.HAND_MODEL == 'marker')
+    except RuntimeError as e:
+        source.release()
+        print(f"Error: {e}")
+        return
+    print(f"Hand tracking server '{name}' running, press Ctrl+C to stop")
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+class HandServerClient:
+    """Read landmarks published by a HandTrackingServer, same latest() interface as the trackers"""
+    MAX_READ_RETRIES = 1000
+
+    def __init__(self, name):
+        self.shm = _attach_shared_memory(name)
+        self.ctrl, self.labels, self.scores, self.landmarks = _hand_state_views(self.shm.buf)
+        self._seq = 0
+        self._hands = []
+
+    @property
+    def connected(self):
+        """Whether the server is still running; it clears its pid when it stops cleanly"""
+        return _process_alive(int(self.ctrl[CTRL_SERVER_PID]))
+
+    def latest(self):
+        """Latest (result_seq, hands), retrying a bounded number of times while the server is mid-write
+
+        A server killed mid-write leaves RESULT_SEQ odd for good; the last
+        complete result is returned instead of spinning.
+        """
+        ctrl = self.ctrl
+        for _ in range(self.MAX_READ_RETRIES):
+            seq = int(ctrl[CTRL_RESULT_SEQ])
+            if seq == self._seq:
+                break
+            if seq % 2 == 0:
+                hands = [
+                    (HAND_LABELS[self.labels[i]], self.landmarks[i].copy(), float(self.scores[i]))
+                    for i in range(min(int(ctrl[CTRL_NUM_HANDS]), MAX_HANDS))
+                ]
+                if int(ctrl[CTRL_RESULT_SEQ]) == seq:
+                    self._seq = seq
+                    self._hands = hands
+                    break
+        return self._seq // 2, self._hands
+
+    @property
+    def inference_time(self):
+        return self.ctrl[CTRL_INFERENCE_US] / 1e6
+
+    def close(self):
+        del self.ctrl, self.labels, self.scores, self.landmarks
+        self.shm.close()
+
+class LandmarkExtrapolator:
+    """Predict the index tip between inferences from its recent velocity"""
+    def __init__(self, max_ticks):
+        self.max_ticks = max_ticks
+        self.reset()
+
+    def reset(self):
+        self.tip = None
+        self.tick = 0
+        self.velocity = (0.0, 0.0)
+
+    def update(self, tip, tick):
+        """Record a confirmed index-tip position seen at the given tick"""
+        if self.tip is not None and tick > self.tick:
+            dt = tick - self.tick
+            self.velocity = ((tip[0] - self.tip[0]) / dt, (tip[1] - self.tip[1]) / dt)
+        else:
+            self.velocity = (0.0, 0.0)
+        self.tip = (float(tip[0]), float(tip[1]))
+        self.tick = tick
+
+    def predict(self, tick):
+        if self.tip is None:
+            return None
+        # 外推时间有上限，防止长时间无结果时飞出画面
+        dt = min(tick - self.tick, self.max_ticks)
+        return (min(max(self.tip[0] + self.velocity[0] * dt, 0.0), 1.0),
+                min(max(self.tip[1] + self.velocity[1] * dt, 0.0), 1.0))
+
+class LerpFilter:
+    """Fixed-ratio exponential smoothing, the original bird movement"""
+    def __init__(self, alpha=0.15):
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self, value=None):
+        self.value = None if value is None else np.array(value, dtype=np.float64)
+
+    def __call__(self, value, timestamp):
+        value = np.asarray(value, dtype=np.float64)
+        if self.value is None:
+            self.value = value.copy()
+        else:
+            self.value += (value - self.value) * self.alpha
+        return self.value
+
+class OneEuroFilter:
+    """Speed-adaptive low-pass filter (Casiez et al. 2012), one state per axis
+
+    Slow movement gets a low cutoff to remove jitter, fast movement raises the
+    cutoff by beta * speed so the output does not lag behind.
+    """
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0, rate=60):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.rate = rate
+        self.reset()
+
+    def reset(self, value=None):
+        self.value = None if value is None else np.array(value, dtype=np.float64)
+        self.derivative = None if value is None else np.zeros_like(self.value)
+        self.timestamp = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * np.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, value, timestamp):
+        value = np.asarray(value, dtype=np.float64)
+        if self.value is None:
+            self.value = value.copy()
+            self.derivative = np.zeros_like(self.value)
+            self.timestamp = timestamp
+            return self.value
+
+        dt = timestamp - self.timestamp if self.timestamp is not None else 0.0
+        if dt <= 0:
+            dt = 1.0 / self.rate
+        self.timestamp = timestamp
+
+        # 先平滑速度，再用速度决定每个轴的截止频率
+        a_d = self._alpha(self.d_cutoff, dt)
+        self.derivative += a_d * ((value - self.value) / dt - self.derivative)
+        cutoff = self.min_cutoff + self.beta * np.abs(self.derivative)
+        self.value += self._alpha(cutoff, dt) * (value - self.value)
+        return self.value
+
+def create_movement_filter(name):
+    if name == 'lerp':
+        return LerpFilter(GameConfig.LERP_ALPHA)
+    if name == 'one_euro':
+        return OneEuroFilter(GameConfig.ONE_EURO_MIN_CUTOFF, GameConfig.ONE_EURO_BETA,
+                             GameConfig.ONE_EURO_D_CUTOFF, GameConfig.FPS)
+    raise ValueError(f"Unknown movement filter: {name}")
+
+def synthetic_hand_trace(seconds=12, rate=60, noise=2.0, seed=0):
+    """Hand trace in game pixels: still periods, slow drift and fast sweeps plus sensor noise
+
+    Returns (trace, truth), both (N, 3) arrays of (t, x, y).
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    x = np.full_like(t, 130.0)
+    y = np.full_like(t, 300.0)
+    phase = (t % 6.0)
+    # 0-2s静止，2-3s慢速移动，3-4s静止，4-4.5s快速甩动，之后静止
+    slow = (phase >= 2) & (phase < 3)
+    y[slow] += 80 * (phase[slow] - 2)
+    y[phase >= 3] += 80
+    fast = (phase >= 4) & (phase < 4.5)
+    y[fast] -= 400 * (phase[fast] - 4)
+    y[phase >= 4.5] -= 200
+    x += 40 * np.sin(2 * np.pi * t / 6.0) * (phase >= 4)
+    truth = np.stack([t, x, y], axis=1)
+    trace = truth.copy()
+    trace[:, 1:] += rng.normal(0, noise, size=(len(t), 2))
+    return trace, truth
+
+def load_hand_trace(path):
+    """Load a recorded (t, x, y) trace from .npy, .csv or a landmark recording"""
+    if path.endswith(GameConfig.LANDMARK_FILE_EXTENSION):
+        records = load_landmark_recording(path)
+        rows = []
+        for record in records:
+            for i in range(record['num_hands']):
+                if HAND_LABELS[record['labels'][i]] == 'Right':
+                    # 与CameraInput相同的映射：左侧1/3区域
+                    x, y = record['landmarks'][i][8][:2].astype(np.float64)
+                    rows.append((record['time'], x * GameConfig.WINDOW_WIDTH // 3,
+                                 y * GameConfig.WINDOW_HEIGHT))
+        return np.array(rows).reshape(-1, 3)
+    if path.endswith('.npy'):
+        return np.load(path)
+    return np.loadtxt(path, delimiter=',', ndmin=2)
+
+def measure_filter(movement_filter, trace, truth=None, still_speed=30.0):
+    """Jitter (px RMS per frame while the hand is still) and lag (ms) of a filter over a trace"""
+    t, raw = trace[:, 0], trace[:, 1:]
+    movement_filter.reset()
+    out = np.array([movement_filter(sample, ts).copy() for sample, ts in zip(raw, t)])
+    reference = raw if truth is None else truth[:, 1:]
+
+    # 静止段：参考轨迹平滑后速度很低的帧
+    dt = np.median(np.diff(t))
+    kernel = np.ones(9) / 9
+    speed = np.hypot(*[np.convolve(np.gradient(reference[:, i], dt), kernel, 'same') for i in range(2)])
+    still = speed < still_speed
+    step = np.linalg.norm(np.diff(out, axis=0), axis=1)
+    jitter = float(np.sqrt(np.mean(step[still[1:]] ** 2))) if still[1:].any() else 0.0
+
+    # 延迟：输出相对参考轨迹的最佳时间平移
+    errors = [np.mean(np.linalg.norm(out[shift:] - reference[:len(reference) - shift], axis=1))
+              for shift in range(0, 30)]
+    lag = float(np.argmin(errors) * dt * 1000)
+    return jitter, lag
+
+def benchmark_movement_filters(trace_path=None):
+    if trace_path:
+        trace, truth = load_hand_trace(trace_path), None
+    else:
+        trace, truth = synthetic_hand_trace()
+    candidates = {
+        'raw': LerpFilter(1.0),
+        'lerp': create_movement_filter('lerp'),
+        'one_euro': create_movement_filter('one_euro'),
+    }
+    print(f"{'filter':<10} {'jitter(px)':>10} {'lag(ms)':>8}")
+    for name, movement_filter in candidates.items():
+        jitter, lag = measure_filter(movement_filter, trace, truth)
+        print(f"{name:<10} {jitter:>10.2f} {lag:>8.1f}")
+
+class FrameSource:
+    """Something CameraInput can read BGR frames from, like cv2.VideoCapture
+
+    realtime sources are paced to their frame rate and read on the capture
+    thread. The others return the next frame immediately, in order, so the
+    whole pipeline can be profiled deterministically.
+    """
+    realtime = True
+
+    def read(self):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+class CameraSource(FrameSource):
+    def __init__(self, index=0, frame_size=GameConfig.CAMERA_FRAME_SIZE):
+        self.cap = cv2.VideoCapture(index)
+        if not self.cap.isOpened():
+            raise RuntimeError("Cannot open camera")
+        self.negotiate_format(frame_size)
+
+    def negotiate_format(self, frame_size):
+        """Ask the driver for the game's frame size, so preprocessing can skip the resize"""
+        width, height = frame_size
+        # 部分V4L2驱动要求先设置FOURCC再设置分辨率
+        for fourcc in GameConfig.CAMERA_FOURCCS:
+            code = cv2.VideoWriter_fourcc(*fourcc)
+            if self.cap.set(cv2.CAP_PROP_FOURCC, code) and int(self.cap.get(cv2.CAP_PROP_FOURCC)) == code:
+                break
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.cap.set(cv2.CAP_PROP_FPS, GameConfig.CAMERA_FPS)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, GameConfig.CAMERA_BUFFER_SIZE)
+
+        actual_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                       int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        if actual_size != tuple(frame_size):
+            print(f"Camera delivers {actual_size[0]}x{actual_size[1]}, frames will be resized")
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+class PlaybackSource(FrameSource):
+    """Base for recorded and generated frames, paced to fps or as fast as possible"""
+    def __init__(self, fps, realtime=True, loop=True):
+        self.fps = fps
+        self.realtime = realtime
+        self.loop = loop
+        self.index = 0
+        self._start = None
+
+    def next_frame(self, index):
+        """Return frame number index, or None past the end"""
+        raise NotImplementedError
+
+    def read(self):
+        if self.realtime:
+            now = time.perf_counter()
+            if self._start is None:
+                self._start = now
+            delay = self._start + self.index / self.fps - now
+            if delay > 0:
+                time.sleep(delay)
+        frame = self.next_frame(self.index)
+        if frame is None and self.loop and self.index > 0:
+            self.rewind()
+            frame = self.next_frame(self.index)
+        if frame is None:
+            return False, None
+        self.index += 1
+        return True, frame
+
+    def rewind(self):
+        self.index = 0
+        self._start = None
+
+class VideoFileSource(PlaybackSource):
+    def __init__(self, path, realtime=True, loop=True):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Cannot open video file {path}")
+        super().__init__(self.cap.get(cv2.CAP_PROP_FPS) or GameConfig.CAMERA_FPS, realtime, loop)
+
+    def next_frame(self, index):
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def rewind(self):
+        super().rewind()
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def release(self):
+        self.cap.release()
+
+class ImageDirectorySource(PlaybackSource):
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+    def __init__(self, path, realtime=True, loop=True):
+        super().__init__(GameConfig.CAMERA_FPS, realtime, loop)
+        self.paths = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(self.IMAGE_EXTENSIONS)
+        )
+        if not self.paths:
+            raise RuntimeError(f"No images found in {path}")
+
+    def next_frame(self, index):
+        if index >= len(self.paths):
+            return None
+        return cv2.imread(self.paths[index])
+
+class SyntheticSource(PlaybackSource):
+    """Generated frames: a skin-coloured disc moving along a known Lissajous path"""
+    def __init__(self, realtime=True, fps=None, seconds=None, frame_size=GameConfig.CAMERA_FRAME_SIZE):
+        super().__init__(fps or GameConfig.CAMERA_FPS, realtime, loop=False)
+        self.length = None if seconds is None else int(seconds * self.fps)
+        width, height = frame_size
+        # 固定的渐变背景只生成一次
+        gradient = np.linspace(40, 160, width, dtype=np.uint8)
+        self.background = np.repeat(np.repeat(gradient[None, :, None], height, 0), 3, 2)
+
+    def motion(self, index):
+        """Normalized (x, y) of the disc centre in frame number index"""
+        t = index / self.fps
+        return (0.5 + 0.35 * np.sin(2 * np.pi * t / 4.0),
+                0.5 + 0.35 * np.sin(2 * np.pi * t / 3.0))
+
+    def next_frame(self, index):
+        if self.length is not None and index >= self.length:
+            return None
+        height, width = self.background.shape[:2]
+        x, y = self.motion(index)
+        # 每帧新建数组，采集线程交出的帧不会被下一帧覆盖
+        frame = self.background.copy()
+        cv2.circle(frame, (int(x * width), int(y * height)), 24, (120, 160, 220), -1)
+        return frame
+
+def open_frame_source(spec, realtime=True, frame_size=GameConfig.CAMERA_FRAME_SIZE):
+    """Camera index, 'synthetic', a directory of images or a video file"""
+    if isinstance(spec, int) or str(spec).isdigit():
+        return CameraSource(int(spec), frame_size)
+    if spec == 'synthetic':
+        return SyntheticSource(realtime, frame_size=frame_size)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, realtime)
+    return VideoFileSource(spec, realtime)
+
+class QualityGovernor:
+    """Step through GameConfig.QUALITY_LEVELS based on recent frame times
+
+    A level is dropped when the 90th percentile of the last WINDOW frames is over
+    budget, and raised again only when it has stayed well under budget for
+    UPGRADE_HOLD frames, so the two thresholds never chase each other.
+    """
+    def __init__(self, budget_ms, levels, start_level=0):
+        self.budget_ms = budget_ms
+        self.levels = levels
+        self.level = start_level
+        self.frame_times = np.zeros(GameConfig.QUALITY_WINDOW, dtype=np.float32)
+        self.count = 0
+        self.frames_since_change = 0
+
+    @property
+    def level_name(self):
+        return self.levels[self.level]['name']
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    def record(self, frame_ms):
+        """Add one frame time; return True when the level changed"""
+        self.frame_times[self.count % len(self.frame_times)] = frame_ms
+        self.count += 1
+        self.frames_since_change += 1
+        # 窗口填满后每隔一段时间才评估一次，开销固定
+        if self.count < len(self.frame_times) or self.count % GameConfig.QUALITY_CHECK_INTERVAL:
+            return False
+
+        p90 = float(np.percentile(self.frame_times, 90))
+        if p90 > self.budget_ms * GameConfig.QUALITY_DEGRADE_RATIO and self.level < len(self.levels) - 1:
+            return self.set_level(self.level + 1, p90)
+        if (p90 < self.budget_ms * GameConfig.QUALITY_UPGRADE_RATIO and self.level > 0 and
+                self.frames_since_change >= GameConfig.QUALITY_UPGRADE_HOLD):
+            return self.set_level(self.level - 1, p90)
+        return False
+
+    def set_level(self, level, p90=None):
+        self.level = level
+        self.count = 0
+        self.frames_since_change = 0
+        if p90 is not None:
+            print(f"Quality level -> {self.level_name} (p90 frame time {p90:.1f} ms)")
+        return True
+
+class RollingStat:
+    """Fixed-size ring of samples; percentiles cost the same however long the game runs"""
+    def __init__(self, size):
+        self.samples = np.zeros(size, dtype=np.float32)
+        self.count = 0
+
+    def add(self, value):
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+
+    def percentiles(self, q=(50, 90, 99)):
+        filled = self.samples[:min(self.count, len(self.samples))]
+        if not len(filled):
+            return [0.0] * len(q)
+        return [float(v) for v in np.percentile(filled, q)]
+
+class VisionMetrics:
+    """Per-stage timings and detection counters for the camera input path"""
+    STAGES = ('capture_wait', 'preprocess', 'inference', 'postprocess')
+
+    def __init__(self, size=None):
+        size = size or GameConfig.VISION_METRICS_WINDOW
+        self.timings = {stage: RollingStat(size) for stage in self.STAGES}
+        self.confidence = RollingStat(size)
+        self.hands_per_result = RollingStat(size)
+        self.counters = {
+            'ticks': 0,
+            'ticks_without_frame': 0,
+            'frames_inferred': 0,
+            'frames_skipped': 0,  # 读到但因跳帧没有送去推理
+            'frames_dropped': 0,  # 采集线程中被新帧覆盖
+            'results': 0,
+            'results_without_hands': 0,
+        }
+
+    def add_time(self, stage, seconds):
+        self.timings[stage].add(seconds * 1000)
+
+    def add_result(self, hands):
+        self.counters['results'] += 1
+        self.hands_per_result.add(len(hands))
+        if not hands:
+            self.counters['results_without_hands'] += 1
+        for _, _, score in hands:
+            self.confidence.add(score)
+
+    def summary(self):
+        stats = {stage: dict(zip(('p50_ms', 'p90_ms', 'p99_ms'), stat.percentiles()))
+                 for stage, stat in self.timings.items()}
+        stats['confidence'] = dict(zip(('p10', 'p50'), self.confidence.percentiles((10, 50))))
+        stats['hands_per_result'] = dict(zip(('p50', 'p90'), self.hands_per_result.percentiles((50, 90))))
+        stats['counters'] = dict(self.counters)
+        return stats
+
+    def dump(self, path):
+        import json
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def overlay_lines(self):
+        lines = []
+        for stage, stat in self.timings.items():
+            p50, p90, p99 = stat.percentiles()
+            lines.append(f"{stage}: {p50:.1f}/{p90:.1f}/{p99:.1f}ms")
+        c = self.counters
+        lines.append(f"no hand: {c['results_without_hands']}/{c['results']}")
+        lines.append(f"skip {c['frames_skipped']} drop {c['frames_dropped']} "
+                     f"idle {c['ticks_without_frame']}")
+        return lines
+
+InputIntent = namedtuple('InputIntent', ['target', 'shoot'])
+
+class LatencyProbe:
+    """Camera-to-photon latency of each hand result that moved the bird
+
+    Stages: capture -> result read by the game -> bird_pos update -> display.flip.
+    """
+    STAGES = ('result', 'update', 'present', 'total')
+
+    def __init__(self, seconds):
+        self.end_time = time.perf_counter() + seconds
+        self.samples = {stage: [] for stage in self.STAGES}
+        self.last_capture_time = None
+        self.pending = None
+
+    @property
+    def done(self):
+        return time.perf_counter() >= self.end_time
+
+    def bird_updated(self, backend):
+        """Note the result that drove this tick's bird_pos, once per captured frame"""
+        capture_time = backend.result_capture_time
+        if capture_time is None or capture_time == self.last_capture_time:
+            return
+        self.last_capture_time = capture_time
+        self.pending = (capture_time, backend.result_time, time.perf_counter())
+
+    def presented(self):
+        if self.pending is None:
+            return
+        flip_time = time.perf_counter()
+        capture_time, result_time, update_time = self.pending
+        self.pending = None
+        for stage, seconds in (('result', result_time - capture_time),
+                               ('update', update_time - result_time),
+                               ('present', flip_time - update_time),
+                               ('total', flip_time - capture_time)):
+            self.samples[stage].append(seconds * 1000)
+
+    def summary(self):
+        report = {'samples': len(self.samples['total'])}
+        for stage in self.STAGES:
+            values = np.asarray(self.samples[stage])
+            if len(values):
+                p50, p90, p99 = np.percentile(values, (50, 90, 99))
+                report[stage] = {'mean_ms': float(values.mean()), 'p50_ms': float(p50),
+                                 'p90_ms': float(p90), 'p99_ms': float(p99),
+                                 'max_ms': float(values.max())}
+        return report
+
+    def report(self, path=None):
+        summary = self.summary()
+        print(f"Camera-to-photon latency over {summary['samples']} results (ms):")
+        for stage in self.STAGES:
+            if stage in summary:
+                s = summary[stage]
+                print(f"  {stage:8s} mean {s['mean_ms']:6.1f}  p50 {s['p50_ms']:6.1f}  "
+                      f"p90 {s['p90_ms']:6.1f}  p99 {s['p99_ms']:6.1f}  max {s['max_ms']:6.1f}")
+        if path:
+            import json
+            with open(path, 'w') as f:
+                json.dump(summary, f, indent=2)
+
+class InputBackend:
+    """Turns one input device into a move target and a shoot intent per tick"""
+    name = None
+    smooth_movement = False  # 是否需要经过移动滤波
+    result_capture_time = None  # 最近一次手势结果对应帧的采集时间
+    result_time = None  # 游戏读到该结果的时间
+
+    def __init__(self, game):
+        self.game = game
+
+    def handle_event(self, event):
+        pass
+
+    def poll(self):
+        """Return this tick's InputIntent; target is None when the bird should stay put"""
+        raise NotImplementedError
+
+    def draw(self, screen):
+        pass
+
+    def close(self):
+        pass
+
+class KeyboardInput(InputBackend):
+    """Arrow keys or WASD to move, space to shoot"""
+    name = 'keyboard'
+
+    def poll(self):
+        keys = pygame.key.get_pressed()
+        dx = (keys[K_RIGHT] or keys[K_d]) - (keys[K_LEFT] or keys[K_a])
+        dy = (keys[K_DOWN] or keys[K_s]) - (keys[K_UP] or keys[K_w])
+        target = None
+        if dx or dy:
+            speed = GameConfig.KEYBOARD_SPEED
+            target = (self.game.bird_pos[0] + dx * speed, self.game.bird_pos[1] + dy * speed)
+        return InputIntent(target, bool(keys[K_SPACE]))
+
+class MouseInput(InputBackend):
+    """The bird follows the cursor, left button shoots"""
+    name = 'mouse'
+
+    def poll(self):
+        x, y = pygame.mouse.get_pos()
+        # 让鸟的中心对准鼠标
+        return InputIntent((x - 45, y - 45), pygame.mouse.get_pressed()[0])
+
+class GamepadInput(InputBackend):
+    """Left stick or d-pad to move, A or right bumper to shoot"""
+    name = 'gamepad'
+
+    def __init__(self, game):
+        super().__init__(game)
+        pygame.joystick.init()
+        if pygame.joystick.get_count() == 0:
+            raise RuntimeError("No gamepad connected")
+        self.joystick = pygame.joystick.Joystick(0)
+        self.joystick.init()
+
+    def poll(self):
+        dx = self.joystick.get_axis(0)
+        dy = self.joystick.get_axis(1)
+        if self.joystick.get_numhats() > 0:
+            hat_x, hat_y = self.joystick.get_hat(0)
+            dx, dy = dx + hat_x, dy - hat_y
+        if abs(dx) < GameConfig.GAMEPAD_DEADZONE:
+            dx = 0
+        if abs(dy) < GameConfig.GAMEPAD_DEADZONE:
+            dy = 0
+        target = None
+        if dx or dy:
+            speed = GameConfig.KEYBOARD_SPEED
+            target = (self.game.bird_pos[0] + dx * speed, self.game.bird_pos[1] + dy * speed)
+        shoot = any(self.joystick.get_button(b) for b in GameConfig.GAMEPAD_SHOOT_BUTTONS
+                    if b < self.joystick.get_numbuttons())
+        return InputIntent(target, shoot)
+
+    def close(self):
+        self.joystick.quit()
+
+def sweep_script(tick, game):
+    """Default scripted input: sweep up and down the left third, always shooting"""
+    y = game.height / 2 + (game.height / 2 - 60) * np.sin(tick / 90)
+    return InputIntent((game.width // 6, y), True)
+
+class ScriptedInput(InputBackend):
+    """Input from a function of (tick, game), for headless runs without any device"""
+    name = 'script'
+
+    def __init__(self, game, script=None):
+        super().__init__(game)
+        self.script = script or sweep_script
+
+    def poll(self):
+        return self.script(self.game.frame_count, self.game)
+
+class BotInput(InputBackend):
+    """A simple player for balance runs: dodges incoming enemies, lines up with the nearest one
+
+    Every tick each horizontal lane is scored: enemies that will reach the
+    bird within BOT_LOOKAHEAD ticks and overlap the lane count against it,
+    sooner ones more; the nearest enemy's lane and power-ups count for it.
+    The bird then moves toward the best lane at no more than BOT_SPEED.
+    """
+    name = 'bot'
+    LANE_STEP = 10
+
+    def __init__(self, game):
+        super().__init__(game)
+        radius = GameConfig.BIRD_RADIUS
+        self.lanes = np.arange(radius, game.height - radius + 1, self.LANE_STEP, dtype=float)
+        self.home_x = game.width // 6
+
+    def poll(self):
+        game = self.game
+        radius = GameConfig.BIRD_RADIUS
+        x, y = game.bird_pos[0] + radius, game.bird_pos[1] + radius
+        # 不必要的移动略微扣分，避免在两条同样好的线路间来回抖动
+        scores = -np.abs(self.lanes - y) * 0.01
+
+        pollution = game.pollution
+        n = pollution.count
+        if n:
+            pos, size = pollution.pos[:n], pollution.size[:n]
+            is_boss = pollution.kind[:n] == pollution.kinds.index('large')
+            reach_x = np.where(is_boss, GameConfig.BOSS_HITBOX_SIZE[0] / 2, size)
+            reach_y = np.where(is_boss, GameConfig.BOSS_HITBOX_SIZE[1] / 2, size)
+            ahead = pos[:, 0] + reach_x > x - radius
+            # 敌人还要多少帧才会碰到鸟；静止或后退的敌人永远追不上，已经贴上的为0
+            gap = np.maximum(pos[:, 0] - reach_x - x - radius, 0)
+            closing = -pollution.vel[:n, 0]
+            eta = np.divide(gap, closing, out=np.full(n, np.inf), where=closing > 0)
+            eta[gap == 0] = 0
+            incoming = ahead & (eta < GameConfig.BOT_LOOKAHEAD)
+            clearance = np.abs(self.lanes[:, None] - pos[:, 1]) - reach_y - radius
+            danger = (clearance < GameConfig.BOT_SAFETY_MARGIN) & incoming
+            scores -= (danger * (100 / (1 + eta))).sum(axis=1)
+            if ahead.any():
+                nearest = np.flatnonzero(ahead)[np.argmin(pos[ahead, 0])]
+                scores -= np.abs(self.lanes - pos[nearest, 1]) * 0.05
+
+        power_ups = game.power_ups
+        if power_ups.count:
+            ahead = power_ups.pos[:power_ups.count, 0] > x
+            for power_y in power_ups.pos[:power_ups.count][ahead, 1]:
+                scores += np.abs(self.lanes - power_y) < radius
+
+        best = self.lanes[np.argmax(scores)]
+        step = np.clip(best - y, -GameConfig.BOT_SPEED, GameConfig.BOT_SPEED)
+        return InputIntent((self.home_x, float(y + step - radius)), True)
+
+INPUT_LOG_MAGIC = b'BIRDINP1'
+INPUT_LOG_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('shoot', 'u1')])
+
+class InputLogRecorder:
+    """Append one input intent per simulation tick to a compact binary log
+
+    Layout: 8-byte magic, the game's 8-byte RNG seed, then 9-byte records:
+    target x and y as float32 (NaN when there is no target) and a shoot flag.
+    """
+    FLUSH_EVERY = 1024
+
+    def __init__(self, path, seed):
+        self.file = open(path, 'wb')
+        self.file.write(INPUT_LOG_MAGIC)
+        self.file.write(np.array(seed, dtype='<u8').tobytes())
+        self.buffer = np.zeros(self.FLUSH_EVERY, dtype=INPUT_LOG_DTYPE)
+        self.count = 0
+
+    def write(self, target, shoot):
+        """Log one tick and return the target exactly as a replay will see it"""
+        record = self.buffer[self.count]
+        if target is None:
+            record['x'] = record['y'] = np.nan
+            stored = None
+        else:
+            record['x'], record['y'] = target[0], target[1]
+            stored = (float(record['x']), float(record['y']))
+        record['shoot'] = shoot
+        self.count += 1
+        if self.count == self.FLUSH_EVERY:
+            self.flush()
+        return stored
+
+    def flush(self):
+        self.buffer[:self.count].tofile(self.file)
+        self.count = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+def load_input_log(path):
+    """Return (seed, records) of an input log"""
+    with open(path, 'rb') as f:
+        if f.read(len(INPUT_LOG_MAGIC)) != INPUT_LOG_MAGIC:
+            raise ValueError(f"{path} is not an input log")
+        seed = int(np.frombuffer(f.read(8), dtype='<u8')[0])
+        return seed, np.fromfile(f, dtype=INPUT_LOG_DTYPE)
+
+class IntentReplayInput(InputBackend):
+    """Replay an input log tick by tick, with the recorded RNG seed"""
+    name = 'intents'
+
+    def __init__(self, game, path=None):
+        super().__init__(game)
+        seed, self.records = load_input_log(path or GameConfig.INPUT_REPLAY_PATH)
+        # 用录制时的种子重新播种，随机序列与原局一致
+        game.reseed(seed)
+        self.next_record = 0
+
+    @property
+    def finished(self):
+        return self.next_record >= len(self.records)
+
+    def poll(self):
+        if self.finished:
+            return InputIntent(None, False)
+        record = self.records[self.next_record]
+        self.next_record += 1
+        target = None
+        if not np.isnan(record['x']):
+            target = (float(record['x']), float(record['y']))
+        return InputIntent(target, bool(record['shoot']))
+
+def index_tip_target(index_tip, width, height):
+    """Game position for a full-frame normalized index fingertip"""
+    # 限制在左侧1/3区域
+    max_x = width // 3
+    game_x = min(max(30, int(index_tip[0] * max_x)), max_x - 30)
+    game_y = min(max(30, int(index_tip[1] * height)), height - 30)
+    return game_x, game_y
+
+class HandInput(InputBackend):
+    """Hand tracking results to input: right index tip moves, left-hand pinch shoots
+
+    Subclasses supply read_hands(tick) -> (result_seq, hands); this class
+    turns new results into the bird's target and the pinch state, and owns the
+    metrics, the metrics overlay and the landmark recorder.
+    """
+    smooth_movement = True
+
+    def __init__(self, game):
+        super().__init__(game)
+        self.init_tracking_state()
+
+    def init_tracking_state(self):
+        self.last_result_seq = 0
+        self.tip_extrapolator = LandmarkExtrapolator(GameConfig.MAX_EXTRAPOLATION_TICKS)
+        self.left_pinch = False  # 最近一次确认的捏合状态
+        self.metrics = VisionMetrics()
+        self.metrics_overlay = GameConfig.VISION_METRICS_OVERLAY
+        self.metrics_font = None
+        self.recorder = None
+        if GameConfig.LANDMARK_RECORD_PATH:
+            self.recorder = LandmarkRecorder(GameConfig.LANDMARK_RECORD_PATH,
+                                             GameConfig.LANDMARK_RECORD_PRECISION)
+
+    def detect_hand_gesture(self, hand_landmarks):
+        thumb_tip = hand_landmarks[4]
+        index_tip = hand_landmarks[8]
+        distance = np.sqrt((thumb_tip[0] - index_tip[0])**2 + 
+                          (thumb_tip[1] - index_tip[1])**2)
+        return distance < GameConfig.PINCH_THRESHOLD
+
+    def handle_event(self, event):
+        if event.type == KEYDOWN and event.key == K_m:
+            self.metrics_overlay = not self.metrics_overlay
+
+    def read_hands(self, tick):
+        """Return the latest (result_seq, hands); a new seq marks a new result"""
+        raise NotImplementedError
+
+    def poll(self):
+        game = self.game
+        tick = game.frame_count
+
+        # 只读取最新的推理结果，用它更新确认状态
+        self.metrics.counters['ticks'] += 1
+        result_seq, hands = self.read_hands(tick)
+        if result_seq != self.last_result_seq:
+            start = time.perf_counter()
+            self.last_result_seq = result_seq
+            self.metrics.add_result(hands)
+            if self.recorder is not None:
+                self.recorder.write(tick, hands)
+            right_hand = None
+            self.left_pinch = False
+            for label, hand_landmarks, _ in hands:
+                # 右手控制移动
+                if label == 'Right':
+                    right_hand = hand_landmarks
+                # 左手控制射击
+                elif label == 'Left':
+                    self.left_pinch = self.detect_hand_gesture(hand_landmarks)
+
+            if right_hand is not None:
+                self.tip_extrapolator.update(right_hand[8], tick)
+            else:
+                self.tip_extrapolator.reset()
+            self.metrics.add_time('postprocess', time.perf_counter() - start)
+
+        # 两次推理之间按速度外推食指位置
+        index_tip = self.tip_extrapolator.predict(tick)
+        target = None
+        if index_tip is not None:
+            target = index_tip_target(index_tip, game.width, game.height)
+
+        # 沿用最近确认的捏合状态，跳帧期间也不会漏掉射击
+        return InputIntent(target, self.left_pinch)
+
+    def draw(self, screen):
+        if self.metrics_overlay:
+            self.draw_metrics(screen)
+
+    def draw_metrics(self, screen):
+        if self.metrics_font is None:
+            self.metrics_font = pygame.font.Font(None, 20)
+        y = GameConfig.WINDOW_HEIGHT - 20 * len(VisionMetrics.STAGES) - 60
+        for line in self.metrics.overlay_lines():
+            screen.blit(self.metrics_font.render(line, True, (255, 255, 255), (0, 0, 0)), (10, y))
+            y += 20
+
+    def close_tracking_state(self):
+        if self.recorder is not None:
+            self.recorder.close()
+        if GameConfig.VISION_METRICS_PATH:
+            self.metrics.dump(GameConfig.VISION_METRICS_PATH)
+
+    def close(self):
+        self.close_tracking_state()
+
+class CameraInput(HandInput):
+    """MediaPipe hand tracking on frames from the camera or another frame source"""
+    name = 'camera'
+
+    def __init__(self, game):
+        super().__init__(game)
+        try:
+            import_vision()
+            self.mp_hands = mp.solutions.hands
+            self.open_pipeline()
+        except Exception:
+            self.close_tracking_state()
+            raise
+        self.last_inference_tick = -GameConfig.MAX_INFERENCE_INTERVAL
+        self.capture_times = {}  # 帧序号 -> 采集时间
+        self.hand_preview_enabled = False
+        self.hand_preview_surface = None
+        self.last_preview_tick = 0
+        self.set_hand_preview(GameConfig.HAND_PREVIEW_ENABLED)
+
+    def open_pipeline(self):
+        """Open the frame source and the hand tracker at the current quality settings"""
+        quality = self.game.quality_governor.settings
+        self.frame_size = tuple(quality['camera_size'])
+        self.source = open_frame_source(GameConfig.FRAME_SOURCE, GameConfig.FRAME_SOURCE_REALTIME,
+                                        self.frame_size)
+        width, height = self.frame_size
+        self.resize_buffer = np.empty((height, width, 3), dtype=np.uint8)
+        # 实时源在后台线程采集，游戏循环不再等待摄像头；非实时源按顺序同步读取
+        self.camera = CameraCapture(self.source) if self.source.realtime else self.source
+
+        hands_options = dict(
+            max_num_hands=2,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5,
+            model_complexity=quality['model_complexity'],
+            marker=GameConfig.HAND_MODEL == 'marker'
+        )
+        try:
+            if GameConfig.HAND_INFERENCE_PROCESS:
+                self.hand_tracker = HandInferenceWorker(
+                    self.frame_size, GameConfig.FRAME_RING_SLOTS, GameConfig.ROI_TRACKING,
+                    **hands_options
+                )
+            else:
+                self.hand_tracker = LocalHandTracker(self.frame_size, GameConfig.ROI_TRACKING,
+                                                     **hands_options)
+        except Exception:
+            self.camera.release()
+            raise
+
+    def reconfigure(self):
+        """Reopen the capture and the hand model after a quality change
+
+        The old camera is released before the new one opens, since most drivers
+        allow one open at a time. The recorder, metrics and preview state stay
+        as they are; on failure they are closed and the error is raised.
+        """
+        self.camera.release()
+        self.hand_tracker.close()
+        try:
+            self.open_pipeline()
+        except Exception:
+            self.close_tracking_state()
+            raise
+        # 新的推理进程结果序号从0开始
+        self.last_result_seq = 0
+        self.capture_times.clear()
+        self.tip_extrapolator.reset()
+        if self.hand_preview_enabled:
+            # 预览缓冲区要换成新的分辨率
+            self.set_hand_preview(False)
+            self.set_hand_preview(True)
+
+    def prepare_frame(self, frame, dst):
+        mirror_to_rgb(frame, dst, self.resize_buffer)
+
+    def handle_event(self, event):
+        if event.type == KEYDOWN and event.key == K_h:
+            self.set_hand_preview(not self.hand_preview_enabled)
+        else:
+            super().handle_event(event)
+
+    def read_hands(self, tick):
+        """Feed the tracker and return its latest (result_seq, hands)"""
+        metrics = self.metrics
+        start = time.perf_counter()
+        ret, frame = self.camera.read()
+        capture_time = time.perf_counter()
+        metrics.add_time('capture_wait', capture_time - start)
+        if isinstance(self.camera, CameraCapture):
+            capture_time = self.camera.frame_time
+
+        # 新帧每N帧写入一次共享环形缓冲区，由推理进程异步处理
+        published = False
+        if not ret:
+            metrics.counters['ticks_without_frame'] += 1
+        elif tick - self.last_inference_tick >= self.get_inference_interval():
+            slot, frame_rgb = self.hand_tracker.acquire_slot()
+            start = time.perf_counter()
+            self.prepare_frame(frame, frame_rgb)
+            metrics.add_time('preprocess', time.perf_counter() - start)
+            frame_seq = self.hand_tracker.publish_slot(slot)
+            self.capture_times[frame_seq] = capture_time
+            self.last_inference_tick = tick
+            metrics.counters['frames_inferred'] += 1
+            published = True
+        else:
+            metrics.counters['frames_skipped'] += 1
+        if isinstance(self.camera, CameraCapture):
+            metrics.counters['frames_dropped'] = self.camera.frames_dropped
+
+        if (isinstance(self.hand_tracker, HandInferenceWorker) and
+                tick % GameConfig.WORKER_CHECK_INTERVAL == 0):
+            self.hand_tracker.check_alive()
+
+        result_seq, hands = self.hand_tracker.latest()
+        if result_seq != self.last_result_seq:
+            metrics.add_time('inference', self.hand_tracker.inference_time)
+            # 采集时间随帧序号传到结果，推理进程跳过的帧一并清掉
+            result_frame = self.hand_tracker.result_frame
+            self.result_capture_time = self.capture_times.pop(result_frame, None)
+            self.result_time = time.perf_counter()
+            for seq in [seq for seq in self.capture_times if seq < result_frame]:
+                del self.capture_times[seq]
+        if (published and self.hand_preview_enabled and
+                tick - self.last_preview_tick >= GameConfig.HAND_PREVIEW_INTERVAL):
+            self.last_preview_tick = tick
+            self.draw_hand_tracking(frame_rgb, [landmarks for _, landmarks, _ in hands])
+        return result_seq, hands
+
+    def get_inference_interval(self):
+        """Ticks between inferences, fixed or derived from the measured inference time"""
+        minimum = self.game.quality_governor.settings['inference_interval']
+        if not GameConfig.INFERENCE_ADAPTIVE:
+            return max(GameConfig.INFERENCE_INTERVAL, minimum)
+        cost_ms = self.hand_tracker.inference_time * 1000
+        interval = int(np.ceil(cost_ms / GameConfig.INFERENCE_BUDGET_MS))
+        return min(max(minimum, interval), GameConfig.MAX_INFERENCE_INTERVAL)
+
+    def set_hand_preview(self, enabled):
+        """Switch the picture-in-picture hand preview on or off"""
+        # 当前画质等级不允许预览时保持关闭
+        if enabled and not self.game.quality_governor.settings['hand_preview']:
+            enabled = False
+        self.hand_preview_enabled = enabled
+        if enabled and self.hand_preview_surface is None:
+            width, height = self.frame_size
+            self.hand_preview_frame = np.zeros((height, width, 3), dtype=np.uint8)
+            # Surface直接引用numpy内存，之后只需更新数组
+            self.hand_preview_surface = pygame.image.frombuffer(
+                self.hand_preview_frame, (width, height), 'RGB'
+            )
+        elif not enabled:
+            self.hand_preview_frame = None
+            self.hand_preview_surface = None
+
+    def draw_hand_tracking(self, frame_rgb, hand_landmarks):
+        # 拷贝到预览缓冲区再标注，避免改动推理进程正在读取的帧
+        frame = self.hand_preview_frame
+        np.copyto(frame, frame_rgb)
+        height, width = frame.shape[:2]
+        for landmarks in hand_landmarks:
+            points = [(int(x * width), int(y * height)) for x, y, _ in landmarks]
+            for start, end in self.mp_hands.HAND_CONNECTIONS:
+                cv2.line(frame, points[start], points[end], (255, 255, 255), 1)
+            for point in points:
+                cv2.circle(frame, point, 2, (255, 0, 0), -1)
+
+    def draw(self, screen):
+        if self.hand_preview_surface is not None:
+            screen.blit(self.hand_preview_surface, GameConfig.HAND_PREVIEW_POS)
+        super().draw(screen)
+
+    def close(self):
+        self.camera.release()
+        self.hand_tracker.close()
+        super().close()
+
+class LandmarkReplayInput(HandInput):
+    """Replay a landmark recording through the hand post-processing, without cv2 or mediapipe"""
+    name = 'replay'
+
+    def __init__(self, game, path=None):
+        self.records = load_landmark_recording(path or GameConfig.LANDMARK_REPLAY_PATH)
+        super().__init__(game)
+        self.start_tick = game.frame_count
+        self.base_tick = int(self.records['tick'][0]) if len(self.records) else 0
+        self.next_record = 0
+        self.hands = []
+
+    @property
+    def finished(self):
+        return self.next_record >= len(self.records)
+
+    def read_hands(self, tick):
+        # 按录制时的帧号释放结果，同一帧内多条记录只取最新一条
+        elapsed = tick - self.start_tick
+        records = self.records
+        start = self.next_record
+        while (self.next_record < len(records) and
+               records['tick'][self.next_record] - self.base_tick <= elapsed):
+            self.next_record += 1
+        if self.next_record > start:
+            record = records[self.next_record - 1]
+            self.hands = [
+                (HAND_LABELS[record['labels'][i]], record['landmarks'][i].astype(np.float32),
+                 float(record['scores'][i]))
+                for i in range(record['num_hands'])
+            ]
+        return self.next_record, self.hands
+
+class HandServerInput(HandInput):
+    """Subscribe to a running hand tracking server instead of opening the camera"""
+    name = 'server'
+
+    def __init__(self, game, name=None):
+        self.server_name = name or GameConfig.HAND_SERVER_NAME
+        try:
+            self.hand_tracker = HandServerClient(self.server_name)
+        except FileNotFoundError:
+            raise RuntimeError(f"Hand tracking server '{self.server_name}' is not running")
+        if not self.hand_tracker.connected:
+            self.hand_tracker.close()
+            raise RuntimeError(f"Hand tracking server '{self.server_name}' is not running")
+        self.server_lost = False
+        super().__init__(game)
+
+    def check_server(self):
+        """Notice a stopped server, and attach to a new one once it is running"""
+        if not self.server_lost:
+            if not self.hand_tracker.connected:
+                print(f"Hand tracking server '{self.server_name}' stopped, waiting for it to restart")
+                self.server_lost = True
+                # 给一个没有手的新结果，鸟停下、不再射击，不再沿用最后的手势
+                self.lost_result_seq = self.last_result_seq + 1
+            return
+        try:
+            client = HandServerClient(self.server_name)
+        except FileNotFoundError:
+            return
+        if not client.connected:
+            client.close()
+            return
+        print(f"Reconnected to hand tracking server '{self.server_name}'")
+        self.hand_tracker.close()
+        self.hand_tracker = client
+        self.server_lost = False
+        self.last_result_seq = -1
+
+    def read_hands(self, tick):
+        if tick % GameConfig.WORKER_CHECK_INTERVAL == 0:
+            self.check_server()
+        if self.server_lost:
+            return self.lost_result_seq, []
+        result_seq, hands = self.hand_tracker.latest()
+        if result_seq != self.last_result_seq:
+            self.metrics.add_time('inference', self.hand_tracker.inference_time)
+        return result_seq, hands
+
+    def close(self):
+        self.hand_tracker.close()
+        super().close()
+
+INPUT_BACKENDS = {
+    'keyboard': KeyboardInput,
+    'mouse': MouseInput,
+    'gamepad': GamepadInput,
+    'camera': CameraInput,
+    'replay': LandmarkReplayInput,
+    'server': HandServerInput,
+    'script': ScriptedInput,
+    'bot': BotInput,
+    'intents': IntentReplayInput,
+}
+
+class EntityStore:
+    """Struct-of-arrays storage for one kind of entity
+
+    Live entities are packed at [0, count). Positions, the previous tick's
+    positions (for interpolated drawing), velocities and the kind index are
+    always present; extra per-entity columns are given as
+    name=dtype keyword arguments. Slots are reused, so spawning and removing
+    allocate nothing once the arrays have grown to the peak entity count.
+    """
+    def __init__(self, kinds, capacity=64, **fields):
+        self.kinds = tuple(kinds)
+        self.capacity = capacity
+        self.count = 0
+        self.extra_fields = tuple(fields)
+        self.fields = ('pos', 'prev_pos', 'vel', 'kind') + self.extra_fields
+        self.pos = np.zeros((capacity, 2))
+        self.prev_pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        for name, dtype in fields.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.allocate_scratch()
+
+    def allocate_scratch(self):
+        # 压缩时的中转缓冲区和可复用的存活标记
+        self._scratch = {name: np.zeros_like(getattr(self, name)) for name in self.fields}
+        self._mask = np.ones(self.capacity, dtype=bool)
+        self._draw_pos = np.zeros((self.capacity, 2))
+
+    def __len__(self):
+        return self.count
+
+    def grow(self):
+        for name in self.fields:
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros_like(array)]))
+        self.capacity *= 2
+        self.allocate_scratch()
+
+    def add(self, kind, pos, vel=(0.0, 0.0), **values):
+        """Append one entity and return its index; unspecified columns are zeroed"""
+        if self.count == self.capacity:
+            self.grow()
+        i = self.count
+        self.pos[i] = pos
+        self.prev_pos[i] = pos
+        self.vel[i] = vel
+        self.kind[i] = self.kinds.index(kind)
+        for name in self.extra_fields:
+            getattr(self, name)[i] = values.get(name, 0)
+        self.count += 1
+        return i
+
+    def kind_name(self, i):
+        return self.kinds[self.kind[i]]
+
+    def move(self, factor=1.0):
+        n = self.count
+        # 正常速度时是纯加法，不生成临时数组
+        if factor == 1.0:
+            self.pos[:n] += self.vel[:n]
+        else:
+            self.pos[:n] += self.vel[:n] * factor
+
+    def snapshot(self):
+        """Remember the current positions as the previous tick's"""
+        n = self.count
+        self.prev_pos[:n] = self.pos[:n]
+
+    def interpolated(self, alpha):
+        """Positions blended alpha of the way from the previous tick to the current one"""
+        n = self.count
+        out = self._draw_pos[:n]
+        np.subtract(self.pos[:n], self.prev_pos[:n], out=out)
+        out *= alpha
+        out += self.prev_pos[:n]
+        return out
+
+    def live_mask(self):
+        """All-True mask over the live entities, reused every call, for marking removals"""
+        mask = self._mask[:self.count]
+        mask[:] = True
+        return mask
+
+    def keep(self, mask):
+        """Drop the entities where mask is False, survivors stay packed and in order
+
+        All removals of a tick are compacted in one pass through preallocated
+        scratch arrays. Keeping the order stable keeps draw order and hit
+        resolution order unchanged.
+        """
+        n = self.count
+        kept = int(np.count_nonzero(mask))
+        if kept == n:
+            return
+        for name in self.fields:
+            array = getattr(self, name)
+            scratch = self._scratch[name]
+            np.compress(mask, array[:n], axis=0, out=scratch[:kept])
+            array[:kept] = scratch[:kept]
+        self.count = kept
+
+    def clear(self):
+        self.count = 0
+
+# 子弹角度发射后不再改变，速度向量按角度预先算好
+BULLET_VELOCITIES = {
+    angle: (np.cos(np.radians(angle)) * GameConfig.BULLET_SPEED,
+            np.sin(np.radians(angle)) * GameConfig.BULLET_SPEED)
+    for angle in GameConfig.BULLET_SPREAD_ANGLES
+}
+
+def circle_hits(centers, radius, enemy_pos, enemy_size, is_boss):
+    """Circle-vs-enemy hit tests, broadcast over any shapes of circles and enemies
+
+    Ordinary enemies are circles of enemy_size, bosses the BOSS_HITBOX_SIZE
+    rectangle. Distances are compared squared, no square roots.
+    """
+    half_box = np.asarray(GameConfig.BOSS_HITBOX_SIZE) / 2
+    delta = centers - enemy_pos
+    circle = np.sum(delta ** 2, axis=-1) < (enemy_size + radius) ** 2
+    # 圆心到矩形最近点的距离
+    outside = delta - np.clip(delta, -half_box, half_box)
+    rect = np.sum(outside ** 2, axis=-1) < radius ** 2
+    return np.where(is_boss, rect, circle)
+
+SpriteMask = namedtuple('SpriteMask', ['mask', 'width', 'height', 'box'])
+
+class CollisionMasks:
+    """Opaque-pixel masks of the collidable sprites, one per animation frame
+
+    Each mask is built once per image and size and shared by every game in
+    the process, so headless balance workers load each image only once. box
+    is the (left, top, right, bottom) of the opaque pixels relative to the
+    sprite's top-left corner, for a cheap overlap test before the masks.
+    """
+    built = {}  # (path, size) -> SpriteMask
+
+    def __init__(self, load_image):
+        self.load_image = load_image
+        self.frames = {}
+
+    def add(self, name, paths, size):
+        masks = []
+        for path in paths:
+            key = (path, size)
+            if key not in self.built:
+                self.built[key] = self.build(self.load_image(path, size))
+            masks.append(self.built[key])
+        self.frames[name] = masks
+
+    @staticmethod
+    def build(surface):
+        mask = pygame.mask.from_surface(surface, GameConfig.MASK_ALPHA_THRESHOLD)
+        rects = mask.get_bounding_rects()
+        box = rects[0].unionall(rects[1:]) if rects else pygame.Rect(0, 0, 0, 0)
+        width, height = surface.get_size()
+        return SpriteMask(mask, width, height, (box.left, box.top, box.right, box.bottom))
+
+    def get(self, name, frame=0):
+        masks = self.frames[name]
+        return masks[frame % len(masks)]
+
+    def reach(self, names):
+        """Farthest any opaque pixel of these sprites can be from the sprite's center"""
+        return max(max(mask.width, mask.height) for name in names for mask in self.frames[name]) / 2 + 1
+
+class SpatialGrid:
+    """Uniform grid over the playfield, rebuilt from entity positions every tick
+
+    Entities are bucketed by cell with one counting sort. Positions outside
+    the playfield clamp to the border cells, so nothing is ever missed.
+    Queries gather into a scratch buffer that is reused from call to call.
+    """
+    def __init__(self, width, height, cell_size):
+        self.cell_size = cell_size
+        self.cols = width // cell_size + 1
+        self.rows = height // cell_size + 1
+        self.order = np.zeros(0, dtype=np.intp)
+        self.starts = np.zeros(self.cols * self.rows + 1, dtype=np.intp)
+        self.scratch = np.zeros(0, dtype=np.intp)
+
+    def cell(self, x, y):
+        col = np.clip(np.floor_divide(x, self.cell_size), 0, self.cols - 1).astype(np.intp)
+        row = np.clip(np.floor_divide(y, self.cell_size), 0, self.rows - 1).astype(np.intp)
+        return col, row
+
+    def rebuild(self, pos):
+        col, row = self.cell(pos[:, 0], pos[:, 1])
+        cells = row * self.cols + col
+        self.order = np.argsort(cells, kind='stable')
+        np.cumsum(np.bincount(cells, minlength=self.cols * self.rows), out=self.starts[1:])
+        if len(self.scratch) < len(pos):
+            self.scratch = np.zeros(max(len(pos), 2 * len(self.scratch)), dtype=np.intp)
+
+    def query(self, x0, y0, x1, y1):
+        """Indices of the entities in the cells overlapping a box, in ascending order
+
+        The result is a view of the scratch buffer and is only valid until the
+        next query.
+        """
+        # 单个坐标用Python整数运算，比NumPy的标量调用快得多
+        size, last_col, last_row = self.cell_size, self.cols - 1, self.rows - 1
+        col0, col1 = (min(max(int(x // size), 0), last_col) for x in (x0, x1))
+        row0, row1 = (min(max(int(y // size), 0), last_row) for y in (y0, y1))
+        # 同一行的相邻格子在排序结果中是连续的一段，直接拷进缓冲区
+        starts, order, scratch = self.starts, self.order, self.scratch
+        found = 0
+        for row in range(row0 * self.cols, row1 * self.cols + 1, self.cols):
+            start, stop = starts[row + col0], starts[row + col1 + 1]
+            scratch[found:found + stop - start] = order[start:stop]
+            found += stop - start
+        result = scratch[:found]
+        result.sort()
+        return result
+
+LevelProgression = namedtuple('LevelProgression', [
+    'level', 'required_score', 'spawn_interval', 'enemies_per_wave', 'enemy_types',
+    'enemy_cum_weights', 'enemy_speeds', 'power_up_interval', 'low_health_power_up_interval',
+    'invincibility_time'])
+
+def compile_level(level):
+    """Everything that depends on the level, computed from GameConfig"""
+    weights = {
+        'normal': max(50 - level * 2, 20),
+        'fast': min(30 + level * 2, 50),
+        'large': min(20 + level, 30)
+    }
+    total_weight = sum(weights.values())
+    speed_bonus = 1 + (GameConfig.SPEED_INCREASE_PER_LEVEL * (level - 1))
+    power_up_interval = max(
+        GameConfig.MIN_POWER_UP_INTERVAL,
+        GameConfig.POWER_UP_BASE_INTERVAL - level * GameConfig.POWER_UP_INTERVAL_DECREASE
+    )
+    return LevelProgression(
+        level=level,
+        # 达到这个分数就升到下一级
+        required_score=int(GameConfig.BASE_LEVEL_SCORE *
+                           (GameConfig.LEVEL_SCORE_MULTIPLIER ** (level - 1))),
+        spawn_interval=max(GameConfig.MIN_SPAWN_INTERVAL, 50 - int(level * 1.5)),
+        # Base number of enemies plus one every 4 levels
+        enemies_per_wave=min(4, 2 + (level - 1) // 4),
+        enemy_types=tuple(weights),
+        # 累积权重直接交给random.choices，省去每次求和
+        enemy_cum_weights=tuple(accumulate(weight / total_weight for weight in weights.values())),
+        enemy_speeds={enemy_type: min(GameConfig.ENEMY_BASE_SPEED[enemy_type] * speed_bonus,
+                                      GameConfig.MAX_SPEED[enemy_type])
+                      for enemy_type in weights},
+        power_up_interval=power_up_interval,
+        low_health_power_up_interval=int(power_up_interval * (1 - GameConfig.LOW_HEALTH_BONUS_CHANCE)),
+        invincibility_time=min(
+            GameConfig.BASE_INVINCIBILITY_TIME + level * GameConfig.INVINCIBILITY_INCREASE_PER_LEVEL,
+            GameConfig.MAX_INVINCIBILITY_TIME
+        ),
+    )
+
+class ProgressionTable:
+    """Per-level spawn, speed, score and invincibility values, compiled once per level
+
+    Levels are compiled on first use, from the GameConfig values at that time,
+    so the per-tick code only looks values up.
+    """
+    def __init__(self):
+        self.levels = {}
+        # 道具权重只取决于血量落在哪个区间
+        self.power_up_weights = {}
+        for low_health, low_shield in ((False, False), (False, True), (True, True)):
+            weights = {
+                'health': 10 if low_health else 5,
+                'shield': 6 if low_shield else 3,
+                'rapid_fire': 20,
+                'triple_shot': 20,
+                'split_shot': 20
+            }
+            total_weight = sum(weights.values())
+            self.power_up_weights[low_health, low_shield] = (
+                tuple(weights), tuple(accumulate(weight / total_weight for weight in weights.values())))
+
+    def __getitem__(self, level):
+        stage = self.levels.get(level)
+        if stage is None:
+            stage = self.levels[level] = compile_level(level)
+        return stage
+
+    def power_ups_for(self, health):
+        """(types, cumulative weights) of the power-up drawn at this health"""
+        return self.power_up_weights[health < 30, health < 40]
+
+    def export(self, levels=None):
+        """The first levels of the curve as plain dicts, for inspection or JSON"""
+        rows = []
+        for level in range(1, (levels or GameConfig.PROGRESSION_EXPORT_LEVELS) + 1):
+            row = self[level]._asdict()
+            cum_weights = row.pop('enemy_cum_weights')
+            row['enemy_weights'] = dict(zip(row.pop('enemy_types'),
+                                            np.diff(cum_weights, prepend=0.0).round(4).tolist()))
+            rows.append(row)
+        return {
+            'levels': rows,
+            'power_up_weights': {
+                f"health<30={low_health} health<40={low_shield}":
+                    dict(zip(types, np.diff(cum_weights, prepend=0.0).round(4).tolist()))
+                for (low_health, low_shield), (types, cum_weights) in self.power_up_weights.items()
+            },
+        }
+
+def print_progression_table(levels=None, path=None):
+    table = ProgressionTable().export(levels)
+    print("level  score  spawn every  per wave  normal/fast/large %   speeds              "
+          "power-up every  invincible")
+    for row in table['levels']:
+        weights = '/'.join(f"{weight * 100:.0f}" for weight in row['enemy_weights'].values())
+        speeds = '/'.join(f"{speed:.2f}" for speed in row['enemy_speeds'].values())
+        print(f"{row['level']:5d} {row['required_score']:6d} {row['spawn_interval']:12d} "
+              f"{row['enemies_per_wave']:9d}  {weights:19s} {speeds:19s} "
+              f"{row['power_up_interval']:14d} {row['invincibility_time']:11d}")
+    if path:
+        import json
+        with open(path, 'w') as f:
+            json.dump(table, f, indent=2)
+
 class MenuState:
     def __init__(self, game):
         self.game = game
@@ -303,12 +2507,17 @@ class MenuState:
             self.clock.tick(60)
 
 class Game:
-    def __init__(self):
-        pygame.init()
+    def __init__(self, headless=False):
+        # 无头模式不打开窗口、声音和摄像头，只推进模拟
+        self.headless = headless
         self.width = GameConfig.WINDOW_WIDTH
         self.height = GameConfig.WINDOW_HEIGHT
-        self.screen = pygame.display.set_mode((self.width, self.height))
-        pygame.display.set_caption("Environmental Awareness")
+        if headless:
+            self.screen = None
+        else:
+            pygame.init()
+            self.screen = self.open_window()
+            pygame.display.set_caption("Environmental Awareness")
         self.highscore = self.load_highscore()
 
         self.running = True
@@ -323,9 +2532,6 @@ class Game:
         self.combo_timer = 0
         self.milestone_power_up_counter = 0
 
-        # Initialize mediapipe
-        self.init_camera()
-        
         # Bird properties
         self.bird_pos = GameConfig.BIRD_START_POS.copy()
         self.last_valid_pos = GameConfig.BIRD_START_POS.copy()
@@ -336,9 +2542,17 @@ class Game:
         self.invincible_timer = 0
         self.flash_effect = False
         self.frame_count = 0
-        
+        self.movement_filter = create_movement_filter(GameConfig.MOVEMENT_FILTER)
+        self.quality_governor = QualityGovernor(1000 / GameConfig.FPS, GameConfig.QUALITY_LEVELS,
+                                                GameConfig.QUALITY_START_LEVEL)
+        # 所有游戏内随机数都来自这个生成器，同一种子加同一输入必然得到同一局
+        self.rng = random.Random()
+        self.reseed(GameConfig.RANDOM_SEED if GameConfig.RANDOM_SEED is not None
+                    else random.randrange(2 ** 63))
+
         # Damage values
         self.damage_values = GameConfig.DAMAGE_VALUES
+        self.progression = ProgressionTable()
         
         # Special effects system
         self.effects = {
@@ -352,45 +2566,125 @@ class Game:
         # Game collections
         self.score = 0
         self.level = 1
-        self.bullets = []
-        self.pollution = []
-        self.power_ups = []
+        # 子弹、敌人和道具按列存放在NumPy数组中，移动和出界剔除整批完成
+        self.bullets = EntityStore(('default', 'triple_shot', 'split_shot'),
+                                   GameConfig.ENTITY_CAPACITY['bullets'], power=np.int16)
+        self.pollution = EntityStore(('normal', 'fast', 'large'),
+                                     GameConfig.ENTITY_CAPACITY['pollution'],
+                                     size=np.float64, health=np.int16)
+        self.power_ups = EntityStore(('health', 'shield', 'rapid_fire', 'triple_shot', 'split_shot'),
+                                     GameConfig.ENTITY_CAPACITY['power_ups'])
+        # 碰撞查询只检查相邻格子里的实体
+        self.grids = {name: SpatialGrid(self.width, self.height, GameConfig.GRID_CELL_SIZE)
+                      for name in ('bullets', 'pollution', 'power_ups')}
         self.clock = pygame.time.Clock()
         self.time_factor = 1.0
         
         # Initialize backgrounds dictionary before loading assets
         self.backgrounds = {}
         
-        # Initialize active animations list
-        self.active_animations = []
+        # 动画也放进实体数组：当前帧、帧计数和每帧延迟
+        self.active_animations = EntityStore(('recovery', 'impact'), 32,
+                                             frame=np.int16, counter=np.int16, delay=np.int16)
+        self.impact_animation_count = 0
         
         # Initialize assets after all required attributes are set
-        self.init_assets()
-
-        self.menu_state = MenuState(self)
-        self.in_menu = True
-
-    def init_camera(self):
+        if headless:
+            self.init_headless_state()
+            self.menu_state = None
+            self.in_menu = False
+        else:
+            self.init_assets()
+            self.menu_state = MenuState(self)
+            self.in_menu = True
+
+        # Initialize input backend
+        # 摄像头会启动采集线程和推理进程，放在最后，前面加载资源失败时不会留下它们
+        self.input_backend = None
+        if headless:
+            if not self.set_input_backend(GameConfig.HEADLESS_INPUT):
+                raise RuntimeError(f"Cannot start headless input '{GameConfig.HEADLESS_INPUT}'")
+        elif not self.set_input_backend(GameConfig.INPUT_BACKEND):
+            print("Warning: falling back to keyboard controls")
+            self.set_input_backend('keyboard')
+        
+        self.input_log = None
+        if GameConfig.INPUT_LOG_PATH:
+            self.input_log = InputLogRecorder(GameConfig.INPUT_LOG_PATH, self.seed)
+
+        # 延迟测试直接进入游戏，到时自动结束
+        self.latency_probe = None
+        if GameConfig.LATENCY_TEST:
+            self.latency_probe = LatencyProbe(GameConfig.LATENCY_TEST_SECONDS)
+            self.in_menu = False
+
+    def reseed(self, seed):
+        self.seed = seed
+        self.rng.seed(seed)
+
+    def set_input_backend(self, name):
+        """Switch to another input backend, keeping the current one if it fails to start"""
         try:
-            self.mp_hands = mp.solutions.hands
-            self.mp_draw = mp.solutions.drawing_utils
-            self.hands = self.mp_hands.Hands(
-                max_num_hands=2,
-                min_detection_confidence=0.5,
-                min_tracking_confidence=0.5,
-                model_complexity=0
-            )
-            self.cap = cv2.VideoCapture(0)
-            if not self.cap.isOpened():
-                print("Warning: Cannot open camera, falling back to keyboard controls")
-                self.use_camera = False
-                return False
-            self.use_camera = True
-            return True
+            backend = INPUT_BACKENDS[name](self)
         except Exception as e:
-            print(f"Error initializing camera: {e}")
-            self.use_camera = False
+            print(f"Error initializing {name} input: {e}")
             return False
+        if self.input_backend is not None:
+            self.input_backend.close()
+        self.input_backend = backend
+        self.movement_filter.reset(self.bird_pos)
+        return True
+
+    def apply_quality_level(self, previous):
+        """Push the governor's current settings into the running game"""
+        settings = self.quality_governor.settings
+        backend = self.input_backend
+        # 回放和共享服务不在本进程推理，不受画质等级影响
+        if isinstance(backend, CameraInput):
+            # 模型和分辨率只能在重建摄像头输入时生效
+            if (settings['model_complexity'] != previous['model_complexity'] or
+                    settings['camera_size'] != previous['camera_size']):
+                try:
+                    backend.reconfigure()
+                except Exception as e:
+                    print(f"Error reopening camera input: {e}")
+                    print("Warning: falling back to keyboard controls")
+                    # 摄像头已经关闭，不能再让set_input_backend关闭一次
+                    self.input_backend = None
+                    self.set_input_backend('keyboard')
+            elif not settings['hand_preview']:
+                backend.set_hand_preview(False)
+
+    def open_window(self):
+        """Open the game window, with vsync if VSYNC is set, and pick the render cap
+
+        pygame only honours vsync through the SCALED renderer, which also scales
+        the window up on large desktops, so it is opt-in and a plain window is
+        the fallback. The cap stays on either way, in case vsync is ignored.
+        """
+        size = (self.width, self.height)
+        screen = None
+        if GameConfig.VSYNC:
+            try:
+                screen = pygame.display.set_mode(size, pygame.SCALED, vsync=1)
+            except pygame.error as e:
+                print(f"Vsync not available, capping the frame rate instead: {e}")
+        if screen is None:
+            screen = pygame.display.set_mode(size)
+        self.render_fps_limit = GameConfig.RENDER_FPS_LIMIT
+        if self.render_fps_limit is None:
+            self.render_fps_limit = self.display_refresh_rate()
+        return screen
+
+    def display_refresh_rate(self):
+        """Refresh rate of the desktop, or DEFAULT_REFRESH_RATE when pygame cannot tell"""
+        # 只有较新的pygame才能查询刷新率
+        get_refresh_rates = getattr(pygame.display, 'get_desktop_refresh_rates', None)
+        if get_refresh_rates is not None:
+            rates = [rate for rate in get_refresh_rates() if rate > 0]
+            if rates:
+                return rates[0]
+        return GameConfig.DEFAULT_REFRESH_RATE
 
     def load_image(self, path, size=None):
         try:
@@ -423,7 +2717,7 @@ class Game:
         # Load bullet image
         self.bullet_image = self.load_image(
             GameConfig.ASSETS['bullet'],
-            (30, 30)
+            GameConfig.SPRITE_SIZES['bullet']
         )
 
         # 然后加载特殊子弹图片
@@ -431,12 +2725,12 @@ class Game:
             'default': self.bullet_image  # 现在可以使用 bullet_image 了
         }
         for bullet_type, path in GameConfig.BULLET_TYPES.items():
-            self.bullet_images[bullet_type] = self.load_image(path, (30, 30))
+            self.bullet_images[bullet_type] = self.load_image(path, GameConfig.SPRITE_SIZES['bullet'])
 
         # 加载道具图标
         self.power_up_icons = {}
         for power_type, path in GameConfig.POWER_UP_ICONS.items():
-            self.power_up_icons[power_type] = self.load_image(path, (70, 70))
+            self.power_up_icons[power_type] = self.load_image(path, GameConfig.SPRITE_SIZES['power_up'])
 
         # 加载背景
         for state, path in GameConfig.BACKGROUNDS.items():
@@ -447,12 +2741,7 @@ class Game:
             except (pygame.error, FileNotFoundError) as e:
                 print(f"Error loading background {path}: {e}")
                 fallback = pygame.Surface((self.width, self.height))
-                if state == 'healthy':
-                    fallback.fill((135, 206, 235))
-                elif state == 'slight_damage':
-                    fallback.fill((170, 170, 170))
-                else:
-                    fallback.fill((139, 69, 19))
+                fallback.fill(GameConfig.BACKGROUND_COLORS[state])
                 self.backgrounds[state] = fallback
         
         # 加载污染物图片
@@ -462,15 +2751,9 @@ class Game:
             'large': []
         }
 
-        pollution_sizes = {
-            'normal': (70, 70),
-            'fast': (60, 60),
-            'large': (72, 120)
-        }
-        
         for enemy_type, paths in GameConfig.POLLUTION_ASSETS.items():
             for path in paths:
-                image = self.load_image(path, pollution_sizes[enemy_type])
+                image = self.load_image(path, GameConfig.SPRITE_SIZES[enemy_type])
                 self.pollution_images[enemy_type].append(image)
 
         # 加载游戏结束图片
@@ -478,6 +2761,19 @@ class Game:
             GameConfig.ASSETS['game_over'],
             (self.width // 2, self.height // 3)
         )
+        self.game_over_screen = self.load_image(
+            'Animation/Effects/Game_Over.PNG',
+            (self.width, self.height)
+        )
+
+        # 字体只加载一次，界面每帧都要用
+        try:
+            self.ui_font = pygame.font.Font('font/press_start_2p.ttf', 16)  # 降低字号到16
+            self.game_over_font = pygame.font.Font('font/press_start_2p.ttf', 24)
+        except:
+            print("Pixel font not found, using default font")
+            self.ui_font = pygame.font.Font(None, 28)  # 相应降低默认字号
+            self.game_over_font = pygame.font.Font(None, 48)
 
         # 加载护盾图片
         self.shield_image = self.load_image(
@@ -495,6 +2791,8 @@ class Game:
         for path in GameConfig.IMPACT_ANIMATION:
             image = self.load_image(path, (100, 100))  # 可以调整爆炸效果的大小
             self.impact_frames.append(image)
+        self.animation_frames = {'recovery': self.recovery_frames, 'impact': self.impact_frames}
+        self.animation_lengths = np.array([len(self.recovery_frames), len(self.impact_frames)])
 
         # 加载鸟的动画
         self.bird_images = {
@@ -503,16 +2801,18 @@ class Game:
             'heavily_damaged': []
         }
         
+        bird_size = GameConfig.SPRITE_SIZES['bird']
         for i in range(1, 5):
             self.bird_images['healthy'].append(
-                self.load_image(GameConfig.ASSETS['bird_healthy'].format(i), (90, 90))
+                self.load_image(GameConfig.ASSETS['bird_healthy'].format(i), bird_size)
             )
             self.bird_images['slight_damage'].append(
-                self.load_image(GameConfig.ASSETS['bird_slight_damage'].format(i), (90, 90))
+                self.load_image(GameConfig.ASSETS['bird_slight_damage'].format(i), bird_size)
             )
             self.bird_images['heavily_damaged'].append(
-                self.load_image(GameConfig.ASSETS['bird_heavily_damaged'].format(i), (90, 90))
+                self.load_image(GameConfig.ASSETS['bird_heavily_damaged'].format(i), bird_size)
             )
+        self.init_collision_masks()
         
         # Loading sound effect
         self.sound_effect = {}
@@ -526,6 +2826,45 @@ class Game:
         self.current_frame = 0
         self.frame_update_speed = 5
 
+    def init_headless_state(self):
+        """The asset-derived state the simulation reads, without loading images or sounds"""
+        self.sound_effect = {}
+        self.bullet_sound = 'single_shot'
+        self.background_music_playing = False
+        self.game_over_playing = False
+        self.shield_loop_playing = False
+        self.animation_lengths = np.array([len(GameConfig.RECOVERY_ANIMATION),
+                                           len(GameConfig.IMPACT_ANIMATION)])
+        self.current_frame = 0
+        self.frame_update_speed = 5
+        self.base_path = os.path.dirname(__file__)
+        self.init_collision_masks()
+
+    def init_collision_masks(self):
+        """Masks for every frame draw() can show of the bird, enemies, bullets and power-ups"""
+        self.collision_masks = None
+        if not GameConfig.PIXEL_COLLISIONS:
+            return
+        masks = CollisionMasks(self.load_image)
+        sizes = GameConfig.SPRITE_SIZES
+        for state in ('healthy', 'slight_damage', 'heavily_damaged'):
+            masks.add('bird_' + state,
+                      [GameConfig.ASSETS['bird_' + state].format(i) for i in range(1, 5)], sizes['bird'])
+        for enemy_type, paths in GameConfig.POLLUTION_ASSETS.items():
+            masks.add(enemy_type, paths, sizes[enemy_type])
+        masks.add('bullet_default', [GameConfig.ASSETS['bullet']], sizes['bullet'])
+        for bullet_type, path in GameConfig.BULLET_TYPES.items():
+            masks.add('bullet_' + bullet_type, [path], sizes['bullet'])
+        for power_type, path in GameConfig.POWER_UP_ICONS.items():
+            masks.add('power_up_' + power_type, [path], sizes['power_up'])
+        # 网格粗筛时按精灵中心查找，查询框要向外扩展这么多
+        self.sprite_reach = {
+            'pollution': masks.reach(GameConfig.POLLUTION_ASSETS),
+            'power_ups': masks.reach('power_up_' + kind for kind in GameConfig.POWER_UP_ICONS),
+            'bullets': masks.reach(name for name in masks.frames if name.startswith('bullet_')),
+        }
+        self.collision_masks = masks
+
     def load_highscore(self):
         try:
             with open(GameConfig.HIGHSCORE_FILE, 'r') as f:
@@ -534,6 +2873,9 @@ class Game:
             return 0
             
     def save_highscore(self):
+        # 模拟出来的分数不写入最高分
+        if self.headless:
+            return
         try:
             with open(GameConfig.HIGHSCORE_FILE, 'w') as f:
                 f.write(str(self.highscore))
@@ -541,101 +2883,176 @@ class Game:
             print("Unable to save highscore")
         
             
-    def check_collision(self, pos1, pos2, size2, is_bullet=False):
+    def find_bullet_hits(self):
+        """All bullet hits this tick as (enemy, bullet) index pairs, in resolution order
+
+        Each enemy is tested in one batch against the bullets in the grid cells
+        around it. Each bullet is used up by the first enemy it hits, in enemy
+        order, and an enemy stops absorbing bullets once they have taken its
+        health to zero.
         """
-        通用的碰撞检测
-        pos1: 第一个物体的位置
-        pos2: 第二个物体的位置
-        size2: 第二个物体的碰撞盒大小
-        is_bullet: 是否是子弹的碰撞检测
+        bullets, pollution = self.bullets, self.pollution
+        num_bullets, num_enemies = bullets.count, pollution.count
+        if not num_bullets or not num_enemies:
+            return []
+        grid = self.grids['bullets']
+        grid.rebuild(bullets.pos[:num_bullets])
+        is_boss = pollution.kind[:num_enemies] == pollution.kinds.index('large')
+        pairs = []
+        free = np.ones(num_bullets, dtype=bool)
+        for i in range(num_enemies):
+            if self.collision_masks is not None:
+                sprite = self.entity_mask('pollution', i)
+                left, top = self.sprite_corner(pollution.pos[i], sprite)
+                reach = self.sprite_reach['bullets']
+                candidates = grid.query(left + sprite.box[0] - reach, top + sprite.box[1] - reach,
+                                        left + sprite.box[2] + reach, top + sprite.box[3] + reach)
+                candidates = candidates[free[candidates]]
+                hits = self.sprite_overlaps(sprite, left, top, 'bullets', candidates)
+            else:
+                x, y = pollution.pos[i]
+                reach_x, reach_y = self.hitbox_reach(pollution.size[i], is_boss[i], GameConfig.BULLET_RADIUS)
+                candidates = grid.query(x - reach_x, y - reach_y, x + reach_x, y + reach_y)
+                candidates = candidates[free[candidates]]
+                if not len(candidates):
+                    continue
+                hits = circle_hits(bullets.pos[candidates], GameConfig.BULLET_RADIUS,
+                                   pollution.pos[i], pollution.size[i], is_boss[i])
+            health = pollution.health[i]
+            for j in candidates[hits]:
+                pairs.append((i, int(j)))
+                free[j] = False
+                health -= bullets.power[j]
+                if health <= 0:
+                    break
+        return pairs
+
+    @staticmethod
+    def hitbox_reach(size, is_boss, radius):
+        """Half extents of the box a circle of radius must touch to hit an enemy"""
+        if is_boss:
+            half_width, half_height = (side / 2 for side in GameConfig.BOSS_HITBOX_SIZE)
+            return half_width + radius, half_height + radius
+        return size + radius, size + radius
+
+    def find_collisions(self, pos1, store, size=None):
+        """Indices of the entities in store that collide with the bird's hitbox at pos1
+
+        The bird is a circle of BIRD_RADIUS; enemies are circles of their size,
+        bosses a BOSS_HITBOX_SIZE rectangle. store is one of 'bullets',
+        'pollution' or 'power_ups'; only entities in the neighbouring grid cells
+        are tested. size overrides the store's per-entity size column.
         """
-        if is_bullet:
-            # 子弹使用更小的碰撞盒
-            collision_size1 = 15  # 子弹碰撞盒半径
-            # 子弹位置已经是中心点，不需要额外偏移
-            center1 = pos1
-        else:
-            # 鸟的碰撞盒
-            collision_size1 = 45  # 图片大小的一半
-            # 计算鸟的中心位置
-            center1 = [
-                pos1[0] + 45,  # 加上图片宽度的一半
-                pos1[1] + 45   # 加上图片高度的一半
-            ]
-        
-        # 对于Boss类型敌人使用矩形碰撞盒
-        for p in self.pollution:
-            if p['type'] == 'large' and pos2 == p['pos']:
-                # Boss使用矩形碰撞盒
-                boss_left = pos2[0] - 36  # 72/2
-                boss_right = pos2[0] + 36
-                boss_top = pos2[1] - 60   # 120/2
-                boss_bottom = pos2[1] + 60
-                
-                # 圆形与矩形的碰撞检测
-                closest_x = max(boss_left, min(center1[0], boss_right))
-                closest_y = max(boss_top, min(center1[1], boss_bottom))
-                
-                distance = np.sqrt((center1[0] - closest_x)**2 + 
-                                (center1[1] - closest_y)**2)
-                
-                return distance < collision_size1
-        
-        # 其他敌人使用圆形碰撞盒
-        distance = np.sqrt((center1[0] - pos2[0])**2 + 
-                        (center1[1] - pos2[1])**2)
-        
-        return distance < (size2 + collision_size1)
-            
-    def detect_hand_gesture(self, hand_landmarks):
-        thumb_tip = hand_landmarks.landmark[4]
-        index_tip = hand_landmarks.landmark[8]
-        distance = np.sqrt((thumb_tip.x - index_tip.x)**2 + 
-                          (thumb_tip.y - index_tip.y)**2)
-        return distance < 0.05
+        entities = getattr(self, store)
+        n = entities.count
+        if not n:
+            return np.zeros(0, dtype=np.intp)
+        # 鸟的位置是图片左上角，碰撞盒以图片中心为圆心
+        radius = GameConfig.BIRD_RADIUS
+        center = np.asarray(pos1, dtype=float) + GameConfig.BIRD_RADIUS
+        sizes = entities.size[:n] if size is None else np.full(n, size, dtype=float)
+        is_boss = np.zeros(n, dtype=bool)
+        if 'large' in entities.kinds:
+            is_boss = entities.kind[:n] == entities.kinds.index('large')
+        reach_x, reach_y = self.hitbox_reach(sizes.max(), False, radius)
+        if is_boss.any():
+            boss_x, boss_y = self.hitbox_reach(0, True, radius)
+            reach_x, reach_y = max(reach_x, boss_x), max(reach_y, boss_y)
+        grid = self.grids[store]
+        candidates = grid.query(center[0] - reach_x, center[1] - reach_y,
+                                center[0] + reach_x, center[1] + reach_y)
+        hits = circle_hits(center, radius, entities.pos[candidates], sizes[candidates],
+                           is_boss[candidates])
+        return candidates[hits]
+
+    def find_bird_collisions(self, store, size=None):
+        """Indices of the entities in store touching the bird
+
+        Uses the sprite masks when they are loaded, otherwise the hitboxes of
+        find_collisions with size as the entities' radius.
+        """
+        if self.collision_masks is None:
+            return self.find_collisions(self.bird_pos, store, size)
+        frame = self.current_frame // self.frame_update_speed
+        sprite = self.collision_masks.get('bird_' + self.bird_state(), frame)
+        left, top = int(self.bird_pos[0]), int(self.bird_pos[1])
+        reach = self.sprite_reach[store]
+        candidates = self.grids[store].query(left + sprite.box[0] - reach, top + sprite.box[1] - reach,
+                                             left + sprite.box[2] + reach, top + sprite.box[3] + reach)
+        return candidates[self.sprite_overlaps(sprite, left, top, store, candidates)]
+
+    def sprite_overlaps(self, sprite, left, top, store, candidates):
+        """Which candidates of store overlap sprite drawn with its top-left corner at (left, top)
+
+        The boxes around the opaque pixels are compared first; only pairs whose
+        boxes overlap go on to the per-pixel test.
+        """
+        entities = getattr(self, store)
+        box_left, box_top, box_right, box_bottom = (left + sprite.box[0], top + sprite.box[1],
+                                                    left + sprite.box[2], top + sprite.box[3])
+        hits = np.zeros(len(candidates), dtype=bool)
+        for k, i in enumerate(candidates):
+            other = self.entity_mask(store, i)
+            other_left, other_top = self.sprite_corner(entities.pos[i], other)
+            if (other_left + other.box[0] < box_right and box_left < other_left + other.box[2] and
+                    other_top + other.box[1] < box_bottom and box_top < other_top + other.box[3]):
+                hits[k] = sprite.mask.overlap(other.mask, (other_left - left, other_top - top)) is not None
+        return hits
+
+    def entity_mask(self, store, i):
+        """Mask of the frame draw() shows for entity i of store"""
+        kind = getattr(self, store).kind_name(i)
+        if store == 'pollution':
+            return self.collision_masks.get(kind, self.frame_count // 10)
+        if store == 'power_ups':
+            return self.collision_masks.get('power_up_' + kind)
+        if kind == 'default' and self.effects['rapid_fire']['duration'] > 0:
+            kind = 'rapid_fire'
+        return self.collision_masks.get('bullet_' + kind)
+
+    @staticmethod
+    def sprite_corner(center, sprite):
+        """Top-left corner of a sprite drawn centered on center, rounded like draw()"""
+        return int(center[0] - sprite.width // 2), int(center[1] - sprite.height // 2)
+
+    def bird_state(self):
+        if self.bird_health >= 75:
+            return 'healthy'
+        elif self.bird_health >= 25:
+            return 'slight_damage'
+        return 'heavily_damaged'
 
     def handle_input(self):
-        for event in pygame.event.get():
+        for event in [] if self.headless else pygame.event.get():
             if event.type == QUIT:
                 self.running = False
-        
-        ret, frame = self.cap.read()
-        if not ret:
-            return
-            
-        frame = cv2.flip(frame, 1)
-        frame = cv2.resize(frame, (320, 240))
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(frame_rgb)
-        
-        shoot = False
-        
-        if results.multi_hand_landmarks:
-            for hand_landmarks, handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
-                # 右手控制移动
-                if handedness.classification[0].label == 'Right':
-                    index_tip = hand_landmarks.landmark[8]
-                    
-                    # 限制在左侧1/3区域
-                    max_x = self.width // 3
-                    game_x = min(max(30, int(index_tip.x * max_x)), max_x - 30)
-                    game_y = min(max(30, int(index_tip.y * self.height)), self.height - 30)
-                    
-                    # 使用较小的平滑系数使移动更平滑
-                    self.bird_pos[0] += (game_x - self.bird_pos[0]) * 0.15
-                    self.bird_pos[1] += (game_y - self.bird_pos[1]) * 0.15
-                    
-                # 左手控制射击
-                elif handedness.classification[0].label == 'Left':
-                    if self.detect_hand_gesture(hand_landmarks) and self.shooting_delay <= 0:
-                        shoot = True
-            
-            if self.frame_count % 2 == 0:
-                self.draw_hand_tracking(frame, results.multi_hand_landmarks)
-        
+            elif event.type == KEYDOWN and event.key in GameConfig.INPUT_SWITCH_KEYS:
+                self.set_input_backend(GameConfig.INPUT_SWITCH_KEYS[event.key])
+            else:
+                self.input_backend.handle_event(event)
+
+        intent = self.input_backend.poll()
+        shoot = intent.shoot and self.shooting_delay <= 0
+
+        target = intent.target
+        if target is not None:
+            if self.input_backend.smooth_movement:
+                # 速度自适应滤波：静止时去抖，快速移动时减少延迟
+                target = self.movement_filter(target, self.frame_count / GameConfig.FPS)
+        elif self.input_backend.smooth_movement:
+            # 重新检测到手时从当前位置开始平滑
+            self.movement_filter.reset(self.bird_pos)
+        if self.input_log is not None:
+            # 记录滤波后的目标，回放时不再经过滤波
+            target = self.input_log.write(target, intent.shoot)
+        if target is not None:
+            self.bird_pos[0], self.bird_pos[1] = float(target[0]), float(target[1])
+
         # 确保边界限制
         self.bird_pos[0] = max(30, min(self.width//3 - 30, self.bird_pos[0]))
         self.bird_pos[1] = max(30, min(self.height - 30, self.bird_pos[1]))
+        if self.latency_probe is not None:
+            self.latency_probe.bird_updated(self.input_backend)
         
         if shoot:
             self.fire_bullet()
@@ -651,12 +3068,6 @@ class Game:
             
         self.frame_count += 1
 
-    def draw_hand_tracking(self, frame, hand_landmarks):
-        for landmarks in hand_landmarks:
-            self.mp_draw.draw_landmarks(frame, landmarks, self.mp_hands.HAND_CONNECTIONS)
-        cv2.imshow('Hand Tracking', frame)
-        cv2.waitKey(1)
-
     def fire_bullet(self):
         angles = set()  # 使用集合避免重复角度
         # 记录当前激活的效果
@@ -671,19 +3082,10 @@ class Game:
         else:
             angles.add(0)
 
-        # 为所有角度创建子弹
-        new_bullets = []
+        # 为所有角度创建子弹，速度查表得到，之后每帧只做加法
+        start = (self.bird_pos[0] + 45, self.bird_pos[1] + 45)
         for angle in angles:
-            bullet = {
-                'pos': [self.bird_pos[0] + 45, self.bird_pos[1] + 45],
-                'angle': angle,
-                'power': 1,
-                'effect': active_effect  # 保存子弹类型
-            }
-            new_bullets.append(bullet)
-        
-        # 添加所有子弹
-        self.bullets.extend(new_bullets)
+            self.bullets.add(active_effect or 'default', start, BULLET_VELOCITIES[angle], power=1)
         
         # 最后再减少使用次数
         if active_effect == 'triple_shot':
@@ -693,55 +3095,21 @@ class Game:
     
     def spawn_enemies(self):
         self.enemy_spawn_timer += 1
+        stage = self.progression[self.level]
         
-        # Calculate spawn interval with smoother scaling
-        interval = max(GameConfig.MIN_SPAWN_INTERVAL, 
-                    50 - int(self.level * 1.5))
-        
-        if self.enemy_spawn_timer >= interval:
+        if self.enemy_spawn_timer >= stage.spawn_interval:
             self.enemy_spawn_timer = 0
             
-            # Base number of enemies plus one every 4 levels
-            num_enemies = 2 + (self.level - 1) // 4
-            num_enemies = min(4, num_enemies)
-            
-            # 定义碰撞盒大小 - 使用图片大小的一半
-            size_map = {
-                'normal': 35,  # 70/2
-                'fast': 30,    # 60/2
-                'large': 36    # 100/2
-            }
-            
-            for _ in range(num_enemies):
+            for _ in range(stage.enemies_per_wave):
                 # Weighted enemy type selection based on level
-                weights = {
-                    'normal': max(50 - self.level * 2, 20),
-                    'fast': min(30 + self.level * 2, 50),
-                    'large': min(20 + self.level, 30)
-                }
-                total_weight = sum(weights.values())
-                weights = {k: v/total_weight for k, v in weights.items()}
-                
-                enemy_type = random.choices(
-                    list(weights.keys()),
-                    weights=list(weights.values())
-                )[0]
-                
-                # Calculate speed with cap
-                base_speed = 8 if enemy_type == 'fast' else 5
-                speed_bonus = 1 + (GameConfig.SPEED_INCREASE_PER_LEVEL * (self.level - 1))
-                actual_speed = min(
-                    base_speed * speed_bonus,
-                    GameConfig.MAX_SPEED[enemy_type]
+                enemy_type = self.rng.choices(stage.enemy_types, cum_weights=stage.enemy_cum_weights)[0]
+                self.pollution.add(
+                    enemy_type,
+                    (self.width, self.rng.randint(50, self.height-50)),
+                    (-stage.enemy_speeds[enemy_type], 0.0),
+                    size=GameConfig.ENEMY_RADII[enemy_type],
+                    health=GameConfig.ENEMY_HEALTH[enemy_type]
                 )
-                
-                self.pollution.append({
-                    'pos': [self.width, random.randint(50, self.height-50)],
-                    'type': enemy_type,
-                    'size': size_map[enemy_type],  # 现在size_map已定义
-                    'speed': actual_speed,
-                    'health': 3 if enemy_type == 'large' else 1
-                })
 
     def run(self):
 
@@ -756,118 +3124,200 @@ class Game:
                 self.in_menu = False
 
             self.running = True  # 确保running被设置
+            step_time = 1.0 / GameConfig.FPS
+            accumulator = 0.0
+            previous_time = time.perf_counter()
             while self.running:
-                if not self.game_over:
-                    self.handle_input()
-                    self.update()
-                else:
-                    for event in pygame.event.get():
-                        if event.type == QUIT:
-                            self.running = False
-                        elif event.type == KEYDOWN:
-                            if event.key == K_r:
-                                self.play_single_sound('button_click', 0, 1.3)
-                                self.reset_game()
-                            elif event.key == K_q:
-                                self.running = False
+                frame_start = time.perf_counter()
+                # 模拟按固定步长推进，渲染慢了就多补几步，快了就在两步之间插值
+                accumulator += min(frame_start - previous_time, GameConfig.MAX_FRAME_TIME)
+                previous_time = frame_start
+                steps = 0
+                while accumulator >= step_time and self.running:
+                    if steps == GameConfig.MAX_UPDATES_PER_FRAME:
+                        # 实在跟不上时丢弃积压，避免越补越慢
+                        accumulator = 0.0
+                        break
+                    self.step()
+                    accumulator -= step_time
+                    steps += 1
             
-                self.draw()
-                self.clock.tick(60)
+                self.draw(accumulator / step_time)
+                # 帧耗时只算模拟和绘制，flip在垂直同步时会等待刷新，不能算进去
+                frame_ms = (time.perf_counter() - frame_start) * 1000
+                pygame.display.flip()
+                if self.latency_probe is not None:
+                    self.latency_probe.presented()
+                    if self.latency_probe.done:
+                        self.running = False
+                    elif self.game_over:
+                        self.reset_game()
+                if GameConfig.QUALITY_GOVERNOR_ENABLED:
+                    # 只统计本帧实际耗时，不含flip和tick的等待
+                    previous = self.quality_governor.settings
+                    if self.quality_governor.record(frame_ms):
+                        self.apply_quality_level(previous)
+                self.clock.tick(self.render_fps_limit)
         finally:
-            if hasattr(self, 'cap'):  # 检查cap是否存在
-                self.cap.release()
-            cv2.destroyAllWindows()
+            self.input_backend.close()
+            self.close_input_log()
+            if self.latency_probe is not None:
+                self.latency_probe.report(GameConfig.LATENCY_REPORT_PATH)
             pygame.quit()
 
+    def step(self):
+        """Advance the simulation by one fixed tick"""
+        # 保存上一步的位置，绘制时在两步之间插值
+        self.last_pos[:] = self.bird_pos
+        for store in (self.bullets, self.pollution, self.power_ups):
+            store.snapshot()
+
+        if not self.game_over:
+            self.handle_input()
+            self.update()
+        elif not self.headless:
+            for event in pygame.event.get():
+                if event.type == QUIT:
+                    self.running = False
+                elif event.type == KEYDOWN:
+                    if event.key == K_r:
+                        self.play_single_sound('button_click', 0, 1.3)
+                        self.reset_game()
+                    elif event.key == K_q:
+                        self.running = False
+        self.current_frame += 1
+
+    def simulate(self, ticks, restart=False):
+        """Step the game headlessly as fast as possible and report what it cost
+
+        Stops at game over unless restart is set, in which case a new game
+        starts and the run continues until ticks have been simulated.
+        """
+        per_level = {}
+        games = 1
+        start_time = time.perf_counter()
+        try:
+            for _ in range(ticks):
+                if self.game_over:
+                    if not restart:
+                        break
+                    self.reset_game()
+                    games += 1
+                level = self.level
+                entities = self.bullets.count + self.pollution.count + self.power_ups.count
+                tick_start = time.perf_counter()
+                self.step()
+                elapsed = time.perf_counter() - tick_start
+                # 每个等级：帧数、总耗时、最大耗时、实体数之和
+                stats = per_level.setdefault(level, [0, 0.0, 0.0, 0])
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+                stats[3] += entities
+                if getattr(self.input_backend, 'finished', False):
+                    break
+        finally:
+            self.input_backend.close()
+            self.close_input_log()
+        wall_time = time.perf_counter() - start_time
+        simulated = sum(stats[0] for stats in per_level.values())
+        return {
+            'ticks': simulated,
+            'games': games,
+            'wall_seconds': wall_time,
+            'speedup': simulated / GameConfig.FPS / wall_time if wall_time else 0.0,
+            'score': self.score,
+            'level': self.level,
+            'game_over': self.game_over,
+            'seed': self.seed,
+            'digest': self.state_digest(),
+            'levels': {
+                level: {'ticks': count, 'mean_ms': total / count * 1000, 'max_ms': worst * 1000,
+                        'mean_entities': entity_sum / count}
+                for level, (count, total, worst, entity_sum) in sorted(per_level.items())
+            },
+        }
+
+    def close_input_log(self):
+        if self.input_log is not None:
+            self.input_log.close()
+            self.input_log = None
+
+    def state_digest(self):
+        """Hash of the simulation state, equal for two runs only if they stayed bit-identical"""
+        digest = hashlib.sha1()
+        digest.update(repr((self.frame_count, self.current_frame, self.bird_pos, self.bird_health,
+                            self.score, self.level, self.invincible_timer, self.shooting_delay,
+                            self.combo_count, self.combo_timer, self.rng.getstate())).encode())
+        for store in (self.bullets, self.pollution, self.power_ups):
+            for name in store.fields:
+                digest.update(getattr(store, name)[:store.count].tobytes())
+        return digest.hexdigest()[:16]
+
     def spawn_power_ups(self):
         self.power_up_spawn_timer += 1
         
-        interval = max(
-            GameConfig.MIN_POWER_UP_INTERVAL,
-            GameConfig.POWER_UP_BASE_INTERVAL - self.level * GameConfig.POWER_UP_INTERVAL_DECREASE
-        )
+        stage = self.progression[self.level]
+        interval = stage.power_up_interval
         
         # 只在血量非常低时才触发概率加成
         if self.bird_health < GameConfig.LOW_HEALTH_THRESHOLD:
-            interval = int(interval * (1 - GameConfig.LOW_HEALTH_BONUS_CHANCE))
+            interval = stage.low_health_power_up_interval
         
         if self.power_up_spawn_timer >= interval:
             self.power_up_spawn_timer = 0
             
-            # 更保守的权重设置
-            weights = {
-                'health': 10 if self.bird_health < 30 else 5,  # 降低阈值和权重
-                'shield': 6 if self.bird_health < 40 else 3,   # 降低阈值和权重
-                'rapid_fire': 20,  # 增加攻击道具权重
-                'triple_shot': 20,
-                'split_shot': 20
-            }
-            
-            total_weight = sum(weights.values())
-            weights = {k: v/total_weight for k, v in weights.items()}
-            
-            power_type = random.choices(
-                list(weights.keys()),
-                weights=list(weights.values())
-            )[0]
+            # 血量低时更容易出回血和护盾
+            power_types, cum_weights = self.progression.power_ups_for(self.bird_health)
+            power_type = self.rng.choices(power_types, cum_weights=cum_weights)[0]
             
-            self.power_ups.append({
-                'type': power_type,
-                'pos': [self.width, random.randint(50, self.height-50)]
-            })
+            self.power_ups.add(power_type, (self.width, self.rng.randint(50, self.height-50)),
+                               (-3.0, 0.0))
         
         # 里程碑道具生成更严格
         if self.milestone_power_up_counter >= 1800:  # 进一步增加间隔
             self.milestone_power_up_counter = 0
             # 只在血量很低时才生成
             if self.bird_health < 25:  # 更严格的血量条件
-                self.power_ups.append({
-                    'type': random.choice(['shield', 'health']),
-                    'pos': [self.width, random.randint(50, self.height-50)]
-                })
+                self.power_ups.add(self.rng.choice(['shield', 'health']),
+                                   (self.width, self.rng.randint(50, self.height-50)), (-3.0, 0.0))
 
     def update_bullets(self):
-        for bullet in self.bullets[:]:
-            speed = 10 * self.time_factor
-            rad_angle = np.radians(bullet['angle'])
-            bullet['pos'][0] += np.cos(rad_angle) * speed
-            bullet['pos'][1] += np.sin(rad_angle) * speed
-            
-            if (bullet['pos'][0] > self.width or 
-                bullet['pos'][1] < 0 or bullet['pos'][1] > self.height):
-                self.bullets.remove(bullet)
+        bullets = self.bullets
+        bullets.move(self.time_factor)
+        pos = bullets.pos[:bullets.count]
+        bullets.keep((pos[:, 0] <= self.width) & (pos[:, 1] >= 0) & (pos[:, 1] <= self.height))
 
     def add_recovery_animation(self, pos):
         """在指定位置添加一个恢复动画"""
-        self.active_animations.append({
-            'type': 'recovery',
-            'frames': self.recovery_frames,
-            'current_frame': 0,
-            'pos': pos.copy(),  # 复制位置以避免引用问题
-            'frame_delay': 5,   # 每5帧更新一次
-            'frame_counter': 0
-        })
+        # 位置复制进数组，之后不随鸟移动
+        self.active_animations.add('recovery', pos, delay=5)  # 每5帧更新一次
 
     def add_impact_animation(self, pos):
         """在指定位置添加爆炸动画"""
-        self.active_animations.append({
-            'type': 'impact',
-            'frames': self.impact_frames,
-            'current_frame': 0,
-            'pos': pos.copy(),  # 复制位置以避免引用问题
-            'frame_delay': 3,   # 增加延迟，使动画更容易看清
-            'frame_counter': 0
-        })
+        # 低画质时限制同时存在的爆炸动画数量
+        if self.impact_animation_count >= self.quality_governor.settings['max_impact_animations']:
+            return
+        self.impact_animation_count += 1
+        self.active_animations.add('impact', pos, delay=3)  # 增加延迟，使动画更容易看清
 
     def update_animations(self):
         """更新所有活动的动画"""
-        for anim in self.active_animations[:]:  # 使用副本来遍历
-            anim['frame_counter'] += 1
-            if anim['frame_counter'] >= anim['frame_delay']:
-                anim['frame_counter'] = 0
-                anim['current_frame'] += 1
-                if anim['current_frame'] >= len(anim['frames']):
-                    self.active_animations.remove(anim)
+        anims = self.active_animations
+        n = anims.count
+        if not n:
+            return
+        counter = anims.counter[:n]
+        counter += 1
+        advance = counter >= anims.delay[:n]
+        counter[advance] = 0
+        anims.frame[:n] += advance
+        # 播放完的动画一次性移除
+        finished = anims.frame[:n] >= self.animation_lengths[anims.kind[:n]]
+        if finished.any():
+            self.impact_animation_count -= int(np.count_nonzero(
+                finished & (anims.kind[:n] == anims.kinds.index('impact'))))
+            anims.keep(~finished)
 
     def update(self):
         # 更新特效持续时间
@@ -891,90 +3341,81 @@ class Game:
         self.update_bullets()
         self.update_animations()
         
-        # 更新污染物
-        for p in self.pollution[:]:
-            p['pos'][0] -= p['speed'] * self.time_factor
-            if p['pos'][0] < -50:
-                self.pollution.remove(p)
-                continue
-                    
-            for bullet in self.bullets[:]:
-                if self.check_collision(bullet['pos'], p['pos'], p['size'], is_bullet=True):
-                    p['health'] -= bullet['power']
-                    if bullet in self.bullets:
-                        self.bullets.remove(bullet)
-                    # 添加爆炸效果
-                    self.add_impact_animation(p['pos'])
-
-                    self.play_multiple_sound('hit_pollution', 0, 0.6)
-
-                    if p['health'] <= 0:
-                        if p in self.pollution:
-                            # 新的计分逻辑
-                            self.combo_count = getattr(self, 'combo_count', 0) + 1
-                            self.combo_timer = 120  # 2 seconds to maintain combo
-                            
-                            combo_bonus = min(
-                                1 + (self.combo_count * GameConfig.COMBO_MULTIPLIER),
-                                GameConfig.MAX_COMBO_MULTIPLIER
-                            )
-                            base_score = GameConfig.BASE_SCORES[p['type']]
-                            self.score += int(base_score * combo_bonus * self.level)
-                            
-                            self.pollution.remove(p)
-                        break
-            
+        # 更新污染物：整批移动，出界的直接剔除
+        pollution = self.pollution
+        bullets = self.bullets
+        pollution.move(self.time_factor)
+        pollution.keep(pollution.pos[:pollution.count, 0] >= -50)
+
+        # 本帧被消灭或撞到鸟的实体先做标记，循环结束后一次性移除
+        pollution_alive = pollution.live_mask()
+        bullet_alive = bullets.live_mask()
+        for i, j in self.find_bullet_hits():
+            pollution.health[i] -= bullets.power[j]
+            bullet_alive[j] = False
+            # 添加爆炸效果
+            self.add_impact_animation(pollution.pos[i])
+
+            self.play_multiple_sound('hit_pollution', 0, 0.6)
+
+            if pollution.health[i] <= 0:
+                # 新的计分逻辑
+                self.combo_count = getattr(self, 'combo_count', 0) + 1
+                self.combo_timer = 120  # 2 seconds to maintain combo
+
+                combo_bonus = min(
+                    1 + (self.combo_count * GameConfig.COMBO_MULTIPLIER),
+                    GameConfig.MAX_COMBO_MULTIPLIER
+                )
+                base_score = GameConfig.BASE_SCORES[pollution.kind_name(i)]
+                self.score += int(base_score * combo_bonus * self.level)
+
+                pollution_alive[i] = False
+
+        self.grids['pollution'].rebuild(pollution.pos[:pollution.count])
+        for i in self.find_bird_collisions('pollution'):
+            p_type = pollution.kind_name(i)
             # 碰撞伤害检测
             if (self.invincible_timer <= 0 and
-                not self.effects['shield']['duration'] > 0 and
-                self.check_collision(self.bird_pos, p['pos'], p['size'])):
+                not self.effects['shield']['duration'] > 0):
                     
-                self.bird_health -= self.damage_values[p['type']]
+                self.bird_health -= self.damage_values[p_type]
 
                 self.play_single_sound('get_hurt', 0, 0.8)
                 
-                # 计算基于等级的无敌时间
-                base_invincibility = GameConfig.BASE_INVINCIBILITY_TIME
-                level_bonus = self.level * GameConfig.INVINCIBILITY_INCREASE_PER_LEVEL
-                self.invincible_timer = min(
-                    base_invincibility + level_bonus,
-                    GameConfig.MAX_INVINCIBILITY_TIME
-                )
+                # 基于等级的无敌时间
+                self.invincible_timer = self.progression[self.level].invincibility_time
                 
                 self.flash_effect = True
-                if p in self.pollution:
-                    self.pollution.remove(p)
+                pollution_alive[i] = False
+        pollution.keep(pollution_alive)
+        bullets.keep(bullet_alive)
 
         # 更新道具
-        for power in self.power_ups[:]:
-            power['pos'][0] -= 3 * self.time_factor
-            if power['pos'][0] < 0:
-                self.power_ups.remove(power)
-            
-            if self.check_collision(self.bird_pos, power['pos'], 10):
-                self.apply_power_up(power['type'])
-                self.power_ups.remove(power)
+        power_ups = self.power_ups
+        power_ups.move(self.time_factor)
+        power_ups.keep(power_ups.pos[:power_ups.count, 0] >= 0)
+        self.grids['power_ups'].rebuild(power_ups.pos[:power_ups.count])
+        remaining = power_ups.live_mask()
+        for i in self.find_bird_collisions('power_ups', GameConfig.POWER_UP_RADIUS):
+            self.apply_power_up(power_ups.kind_name(i))
+            remaining[i] = False
+        power_ups.keep(remaining)
         
         # 检查升级条件
-        required_score = int(GameConfig.BASE_LEVEL_SCORE * 
-                            (GameConfig.LEVEL_SCORE_MULTIPLIER ** (self.level - 1)))
-        
-        if self.score >= required_score:
+        if self.score >= self.progression[self.level].required_score:
             self.level += 1
             self.play_single_sound('level_up', 0, 0.6)
 
             # 更严格的升级奖励条件
             if self.bird_health < 35:  # 降低阈值
                 # 不是每次升级都给道具
-                if random.random() < 0.5:  # 50%概率
-                    self.power_ups.append({
-                        'type': random.choice(['shield', 'health']),
-                        'pos': [self.width, random.randint(50, self.height-50)]
-                    })
+                if self.rng.random() < 0.5:  # 50%概率
+                    self.power_ups.add(self.rng.choice(['shield', 'health']),
+                                       (self.width, self.rng.randint(50, self.height-50)), (-3.0, 0.0))
             # 保留原有的敌人速度增加逻辑
             if self.level > 1:
-                for p in self.pollution:
-                    p['speed'] *= 1.05
+                self.pollution.vel[:self.pollution.count] *= 1.05
         
         # 检查游戏结束条件
         if self.bird_health <= 0:
@@ -989,13 +3430,8 @@ class Game:
         if self.invincible_timer <= 0 and not self.effects['shield']['duration'] > 0:
             self.bird_health -= self.damage_values[damage_type]
             
-            # 计算基于等级的无敌时间
-            base_invincibility = GameConfig.BASE_INVINCIBILITY_TIME
-            level_bonus = self.level * GameConfig.INVINCIBILITY_INCREASE_PER_LEVEL
-            self.invincible_timer = min(
-                base_invincibility + level_bonus,
-                GameConfig.MAX_INVINCIBILITY_TIME
-            )
+            # 基于等级的无敌时间
+            self.invincible_timer = self.progression[self.level].invincibility_time
             
             self.flash_effect = True
             
@@ -1021,7 +3457,7 @@ class Game:
             self.play_single_sound('collect_tools', 0, 1)
         elif power_type == 'shield':
             self.effects['shield']['duration'] += 600  # 累加护盾持续时间
-            self.sound_effect['background_music'].stop() # Stop background music
+            self.stop_sound('background_music') # Stop background music
             self.background_music_playing = False
             if not self.shield_loop_playing:
                 self.play_single_sound('shield_loop', -1, 0.5)
@@ -1030,29 +3466,30 @@ class Game:
             self.effects['split_shot']['uses'] += 3  # 累加分裂子弹使用次数
             self.play_single_sound('collect_tools', 0, 1)
     
-    def draw(self):
-        self.screen.fill((135, 206, 235))
+    def draw(self, alpha=1.0):
+        """Render the current state, alpha of the way from the previous simulation tick
 
+        The caller flips the display, so that frame timing can leave out the
+        wait for the vertical blank.
+        """
+        bird_pos = [last + (current - last) * alpha
+                    for last, current in zip(self.last_pos, self.bird_pos)]
         if self.bird_health >= 75:
-            current_bg = self.backgrounds.get('healthy')
+            bg_state = 'healthy'
         elif self.bird_health >= 25:
-            current_bg = self.backgrounds.get('slight_damage')
+            bg_state = 'slight_damage'
         else:
-            current_bg = self.backgrounds.get('heavily_damaged')
+            bg_state = 'heavily_damaged'
+        current_bg = self.backgrounds.get(bg_state)
 
-        # Draw the background
-        if current_bg:
+        # Draw the background (背景图覆盖整个画面，无需先填充)
+        if current_bg and self.quality_governor.settings['background'] == 'image':
             self.screen.blit(current_bg, (0, 0))
         else:
-            self.screen.fill((135, 206, 235))
+            self.screen.fill(GameConfig.BACKGROUND_COLORS[bg_state])
 
         # 根据健康值选择鸟的状态
-        if self.bird_health >= 75:
-            state = 'healthy'
-        elif self.bird_health >= 25:
-            state = 'slight_damage'
-        else:
-            state = 'heavily_damaged'
+        state = self.bird_state()
 
         # 绘制动画帧
         if state in self.bird_images:
@@ -1064,53 +3501,61 @@ class Game:
                 if self.invincible_timer > 0:
                     if (self.frame_count // 5) % 2 == 0:  # 每 5 帧切换显示/隐藏
                         current_image.set_alpha(230)  # 半透明
-                        self.screen.blit(current_image, self.bird_pos)
+                        self.screen.blit(current_image, bird_pos)
                 else:
                     current_image.set_alpha(255)  # 恢复正常透明度
-                    self.screen.blit(current_image, self.bird_pos)
+                    self.screen.blit(current_image, bird_pos)
             else:
                 print(f"No animation frames found for state: {state}")
         else:
             print(f"Invalid bird state: {state}")
 
-        self.current_frame = (self.current_frame + 1) % (self.frame_update_speed * len(bird_animation))
-        
         self.draw_ui()
 
-        for power in self.power_ups:
-            power_pos = (int(power['pos'][0] - 35), int(power['pos'][1] - 35))  # 居中显示图标
-            if power['type'] in self.power_up_icons:
-                self.screen.blit(self.power_up_icons[power['type']], power_pos)
+        power_ups = self.power_ups
+        positions = power_ups.interpolated(alpha)
+        for i in range(power_ups.count):
+            x, y = positions[i]
+            power_type = power_ups.kind_name(i)
+            power_pos = (int(x - 35), int(y - 35))  # 居中显示图标
+            if power_type in self.power_up_icons:
+                self.screen.blit(self.power_up_icons[power_type], power_pos)
             else:
                 # 如果没有找到图标，使用原来的圆形显示
-                color = self.effects[power['type']]['color']
-                pygame.draw.circle(self.screen, color, 
-                                 (int(power['pos'][0]), int(power['pos'][1])), 35)
+                color = self.effects[power_type]['color']
+                pygame.draw.circle(self.screen, color, (int(x), int(y)), 35)
 
         
-        for p in self.pollution:
+        pollution = self.pollution
+        positions = pollution.interpolated(alpha)
+        for i in range(pollution.count):
             # 根据敌人类型选择对应的动画帧
-            animation_frames = self.pollution_images[p['type']]
+            animation_frames = self.pollution_images[pollution.kind_name(i)]
             current_frame = (self.frame_count // 10) % len(animation_frames)  # 每10帧切换一次动画
             enemy_image = animation_frames[current_frame]
             
             # 计算图片绘制位置（让图片中心对准敌人位置）
-            image_x = int(p['pos'][0] - enemy_image.get_width() // 2)
-            image_y = int(p['pos'][1] - enemy_image.get_height() // 2)
+            x, y = positions[i]
+            image_x = int(x - enemy_image.get_width() // 2)
+            image_y = int(y - enemy_image.get_height() // 2)
             
             self.screen.blit(enemy_image, (image_x, image_y))
         
-        for bullet in self.bullets:
-            bullet_pos = (int(bullet['pos'][0] - 15), int(bullet['pos'][1] - 15))
+        bullets = self.bullets
+        positions = bullets.interpolated(alpha)
+        for i in range(bullets.count):
+            x, y = positions[i]
+            bullet_pos = (int(x - 15), int(y - 15))
+            effect = bullets.kind_name(i)
             
             # 根据子弹自身的效果类型选择图片
             bullet_image = self.bullet_images['default']
             self.bullet_sound = 'single_shot'
             
-            if bullet.get('effect') == 'split_shot':
+            if effect == 'split_shot':
                 bullet_image = self.bullet_images.get('split_shot', self.bullet_images['default'])
                 self.bullet_sound = 'multi_shot'
-            elif bullet.get('effect') == 'triple_shot':
+            elif effect == 'triple_shot':
                 bullet_image = self.bullet_images.get('triple_shot', self.bullet_images['default'])
                 self.bullet_sound = 'multi_shot'
             elif self.effects['rapid_fire']['duration'] > 0:  # rapid fire 效果仍然基于持续时间
@@ -1125,8 +3570,8 @@ class Game:
         if self.effects['shield']['duration'] > 0:
             
             shield_pos = (
-                int(self.bird_pos[0] - (115 - 90) / 2),  # 水平偏移
-                int(self.bird_pos[1] - (115 - 90) / 2)   # 垂直偏移
+                int(bird_pos[0] - (115 - 90) / 2),  # 水平偏移
+                int(bird_pos[1] - (115 - 90) / 2)   # 垂直偏移
             )
             self.screen.blit(self.shield_image, shield_pos)
         else:
@@ -1136,18 +3581,22 @@ class Game:
                 self.play_single_sound('background_music', -1, 0.3)
                 self.background_music_playing = True
         
-        for anim in self.active_animations:
-            if anim['type'] == 'recovery':
-                current_image = anim['frames'][anim['current_frame']]
-                self.screen.blit(current_image, anim['pos'])
-            elif anim['type'] == 'impact':
-                current_image = anim['frames'][anim['current_frame']]
+        anims = self.active_animations
+        for i in range(anims.count):
+            anim_type = anims.kind_name(i)
+            current_image = self.animation_frames[anim_type][anims.frame[i]]
+            x, y = anims.pos[i]
+            if anim_type == 'recovery':
+                self.screen.blit(current_image, (x, y))
+            else:
                 # 将爆炸效果居中显示在碰撞位置
                 impact_pos = (
-                    int(anim['pos'][0] - current_image.get_width() // 2),
-                    int(anim['pos'][1] - current_image.get_height() // 2)
+                    int(x - current_image.get_width() // 2),
+                    int(y - current_image.get_height() // 2)
                 )
                 self.screen.blit(current_image, impact_pos)
+
+        self.input_backend.draw(self.screen)
                                  
         if self.game_over:
             self.draw_game_over()
@@ -1158,16 +3607,11 @@ class Game:
             if not self.game_over_playing:
                 self.play_single_sound('game_over', 0, 0.4)
                 self.game_over_playing = True
-        
-        pygame.display.flip()
+
         
     def draw_ui(self):
-        try:
-            font = pygame.font.Font('font/press_start_2p.ttf', 16)  # 降低字号到16
-        except:
-            print("Pixel font not found, using default font")
-            font = pygame.font.Font(None, 28)  # 相应降低默认字号
-            
+        font = self.ui_font
+
         # 格式化效果名称的辅助函数
         def format_effect_name(name):
             # 将 snake_case 转换为 Title Case 并简化名称
@@ -1228,20 +3672,10 @@ class Game:
                 y += 25
     
     def draw_game_over(self):
-        # 加载游戏结束图片并缩放至全屏
-        game_over_screen = self.load_image(
-            'Animation/Effects/Game_Over.PNG',
-            (self.width, self.height)
-        )
-        
-        self.screen.blit(game_over_screen, (0, 0))
-        
-        try:
-            font = pygame.font.Font('font/press_start_2p.ttf', 24)
-        except:
-            print("Pixel font not found, using default font")
-            font = pygame.font.Font(None, 48)
-        
+        # 全屏的游戏结束图片在init_assets里已经缩放好
+        self.screen.blit(self.game_over_screen, (0, 0))
+        font = self.game_over_font
+
         text_color = (255, 255, 255)  # 改为白色
         shadow_color = (50, 50, 50) 
         
@@ -1299,18 +3733,20 @@ class Game:
         self.screen.blit(hint_surface, hint_rect)
             
     def reset_game(self):
-        overlay = pygame.Surface((self.width, self.height))
-        overlay.fill((0, 0, 0))
-        overlay.set_alpha(128)
-
-        for alpha in range(128, -1, -16):  # 渐隐效果
-            overlay.set_alpha(alpha)
-            self.screen.blit(overlay, (0, 0))
-            pygame.display.flip()
-            self.clock.tick(60)
+        if not self.headless:
+            overlay = pygame.Surface((self.width, self.height))
+            overlay.fill((0, 0, 0))
+            overlay.set_alpha(128)
+
+            for alpha in range(128, -1, -16):  # 渐隐效果
+                overlay.set_alpha(alpha)
+                self.screen.blit(overlay, (0, 0))
+                pygame.display.flip()
+                self.clock.tick(60)
 
         self.bird_pos = [100, self.height//2]
         self.last_pos = self.bird_pos.copy()
+        self.movement_filter.reset(self.bird_pos)
         self.bird_health = 100
         self.shooting_delay = 0
         self.invincible_timer = 0
@@ -1319,8 +3755,12 @@ class Game:
         self.bullets.clear()
         self.pollution.clear()
         self.power_ups.clear()
+        self.active_animations.clear()
+        self.impact_animation_count = 0
         self.game_over = False
         self.flash_effect = False
+        # 结束画面停留的帧数不在输入日志里，动画帧从头算起，回放才能逐位一致
+        self.current_frame = 0
         for effect in self.effects.values():
             effect['duration'] = 0
             effect['uses'] = 0
@@ -1329,8 +3769,14 @@ class Game:
         self.shield_loop_playing = False
         self.game_over_playing = False
     
+    def stop_sound(self, sound_type):
+        if sound_type in self.sound_effect:
+            self.sound_effect[sound_type].stop()
+
     # Play sound without overlap
     def play_single_sound(self, sound_type, loop=0, volume=1.0):
+        if self.headless:
+            return
         if sound_type in self.sound_effect:
             self.sound_effect[sound_type].set_volume(volume)
             self.sound_effect[sound_type].play(loops=loop)
@@ -1339,6 +3785,8 @@ class Game:
     
     # Play sound with overlap
     def play_multiple_sound(self, sound_type, loop=0, volume=1.0):
+        if self.headless:
+            return
         if sound_type in GameConfig.SOUND_TYPES:
             sound = pygame.mixer.Sound(GameConfig.SOUND_TYPES[sound_type])
             sound.set_volume(volume)
@@ -1346,6 +3794,227 @@ class Game:
         else:
             print(f"Sound type '{sound_type}' not found in configuration.")
         
+def print_simulation_report(report):
+    print(f"Simulated {report['ticks']} ticks ({report['games']} game(s)) in "
+          f"{report['wall_seconds']:.2f} s, {report['speedup']:.0f}x real time")
+    print(f"Final score {report['score']}, level {report['level']}"
+          f"{', game over' if report['game_over'] else ''}")
+    print(f"Seed {report['seed']}, final state {report['digest']}")
+    print("level  ticks  mean ms  max ms  entities")
+    for level, stats in report['levels'].items():
+        print(f"{level:5d} {stats['ticks']:6d} {stats['mean_ms']:8.3f} {stats['max_ms']:7.2f} "
+              f"{stats['mean_entities']:9.1f}")
+
+def apply_config_overrides(overrides):
+    """Set GameConfig values and return what is needed to restore them
+
+    A dotted name sets one entry of a dict setting, e.g. 'DAMAGE_VALUES.large'.
+    Only values read when a Game is created or while it runs take effect;
+    tables built at import, such as BULLET_VELOCITIES, do not change.
+    """
+    previous = {}
+    for name, value in overrides.items():
+        attr, _, key = name.partition('.')
+        previous.setdefault(attr, getattr(GameConfig, attr))
+        if key:
+            value = dict(getattr(GameConfig, attr), **{key: value})
+        setattr(GameConfig, attr, value)
+    return previous
+
+def run_balance_game(task):
+    """Play one headless bot game; runs in a balance worker process"""
+    overrides, seed, max_ticks = task
+    previous = apply_config_overrides(dict(overrides, RANDOM_SEED=seed, HEADLESS_INPUT='bot',
+                                           INPUT_LOG_PATH=None, LATENCY_TEST=False))
+    try:
+        report = Game(headless=True).simulate(max_ticks)
+    finally:
+        apply_config_overrides(previous)
+    return report['ticks'], report['level'], report['score'], report['game_over']
+
+def summarize_balance_games(results):
+    ticks, levels, scores, game_over = (np.array(column) for column in zip(*results))
+    survival = ticks / GameConfig.FPS
+    levels_reached, counts = np.unique(levels, return_counts=True)
+
+    def distribution(values):
+        p10, p50, p90 = np.percentile(values, (10, 50, 90))
+        return {'mean': float(values.mean()), 'p10': float(p10), 'p50': float(p50),
+                'p90': float(p90), 'max': float(values.max())}
+
+    return {
+        'games': len(results),
+        'survived': float(1 - game_over.mean()),  # 坚持到时间上限的比例
+        'survival_seconds': distribution(survival),
+        'level': distribution(levels),
+        'levels_reached': {int(level): int(count) for level, count in zip(levels_reached, counts)},
+        'score': distribution(scores),
+    }
+
+def run_balance_sweep(grid, games=None, max_ticks=None, workers=None, seed=0):
+    """Play games bot games for every combination of grid values, in parallel
+
+    grid maps a GameConfig name (dotted for dict entries) to the values to try.
+    Game i of every combination uses seed + i, so combinations are compared
+    on the same enemy and power-up sequences.
+    """
+    import itertools
+    from concurrent.futures import ProcessPoolExecutor
+
+    games = games or GameConfig.BALANCE_GAMES
+    max_ticks = max_ticks or GameConfig.BALANCE_MAX_TICKS
+    workers = workers or GameConfig.BALANCE_WORKERS or os.cpu_count()
+    combinations = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    tasks = [(overrides, seed + i, max_ticks) for overrides in combinations for i in range(games)]
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # 分块派发，减少进程间通信的次数
+        results = list(executor.map(run_balance_game, tasks,
+                                    chunksize=max(1, len(tasks) // (workers * 8))))
+    return {
+        'games_per_config': games,
+        'max_ticks': max_ticks,
+        'workers': workers,
+        'wall_seconds': time.perf_counter() - start_time,
+        'configs': [dict(summarize_balance_games(results[i * games:(i + 1) * games]),
+                         overrides=overrides)
+                    for i, overrides in enumerate(combinations)],
+    }
+
+def print_balance_report(report, path=None):
+    total = report['games_per_config'] * len(report['configs'])
+    print(f"{total} games on {report['workers']} workers in {report['wall_seconds']:.1f} s, "
+          f"up to {report['max_ticks'] / GameConfig.FPS:.0f} s each")
+    labels = [' '.join(f"{name}={value}" for name, value in config['overrides'].items()) or 'default'
+              for config in report['configs']]
+    width = max(len(label) for label in labels + ['config'])
+    print(f"{'config':{width}s} survived  time p10/p50/p90 s   level mean/max  score p50/p90")
+    for label, config in zip(labels, report['configs']):
+        survival, level, score = config['survival_seconds'], config['level'], config['score']
+        print(f"{label:{width}s} {config['survived']:7.0%}  {survival['p10']:5.0f} {survival['p50']:5.0f} "
+              f"{survival['p90']:5.0f}   {level['mean']:6.1f} {level['max']:4.0f}   "
+              f"{score['p50']:6.0f} {score['p90']:6.0f}")
+    if path:
+        import json
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+def parse_grid_option(option):
+    """'NAME=V1,V2,...' -> (NAME, [values]), values parsed as Python literals"""
+    import ast
+    name, _, values = option.partition('=')
+    if not values or not hasattr(GameConfig, name.partition('.')[0]):
+        raise ValueError(f"expected SETTING=V1,V2,... with a GameConfig setting, got '{option}'")
+    return name, [ast.literal_eval(value) for value in values.split(',')]
+
 if __name__ == '__main__':
-    game = Game()
-    game.run()
+    import argparse
+    parser = argparse.ArgumentParser(description="Bird in the City")
+    parser.add_argument('--benchmark-filters', nargs='?', const='', metavar='TRACE',
+                        help="compare movement filters on a recorded (t, x, y) trace, "
+                             "or on a synthetic one when no file is given")
+    parser.add_argument('--input', choices=sorted(INPUT_BACKENDS),
+                        help="input backend to start with (default: camera)")
+    parser.add_argument('--source', metavar='SOURCE',
+                        help="camera index, video file, image directory or 'synthetic'")
+    parser.add_argument('--as-fast-as-possible', action='store_true',
+                        help="play back --source without real-time pacing or dropped frames")
+    parser.add_argument('--record-landmarks', metavar='FILE',
+                        help="record hand-tracking results to a compact binary file")
+    parser.add_argument('--replay-landmarks', metavar='FILE',
+                        help="drive the game from a landmark recording instead of the camera")
+    parser.add_argument('--vision-metrics', metavar='FILE',
+                        help="write vision pipeline timings and counters to a JSON file on exit")
+    parser.add_argument('--roi', action='store_true',
+                        help="run hand inference on a crop around the last detected hands")
+    parser.add_argument('--hand-server', action='store_true',
+                        help="run a shared hand tracking server for games started with --input server")
+    parser.add_argument('--server-name', metavar='NAME',
+                        help="shared memory name of the hand tracking server (default: bird_hands)")
+    parser.add_argument('--latency-test', nargs='?', const=GameConfig.LATENCY_TEST_SECONDS,
+                        type=float, metavar='SECONDS',
+                        help="measure camera-to-photon latency, on the synthetic source "
+                             "unless --source is given")
+    parser.add_argument('--latency-report', metavar='FILE',
+                        help="write the latency distribution to a JSON file")
+    parser.add_argument('--headless', type=int, metavar='TICKS',
+                        help="simulate TICKS ticks without window, audio or camera and report the cost "
+                             "per level; input is scripted, or --replay-landmarks")
+    parser.add_argument('--soak', action='store_true',
+                        help="with --headless, start a new game after each game over")
+    parser.add_argument('--seed', type=int, help="seed for all in-game randomness")
+    parser.add_argument('--record-input', metavar='FILE',
+                        help="log the per-tick input intents and seed, for bit-exact replay")
+    parser.add_argument('--replay-input', metavar='FILE',
+                        help="replay an input log; combine with --headless to profile at full speed")
+    parser.add_argument('--balance', nargs='?', const=GameConfig.BALANCE_GAMES, type=int,
+                        metavar='GAMES', help="play GAMES headless bot games per config combination "
+                        "on all cores and report survival, level and score distributions")
+    parser.add_argument('--grid', action='append', default=[], metavar='SETTING=V1,V2,...',
+                        help="GameConfig values to sweep with --balance, e.g. MIN_SPAWN_INTERVAL=20,30 "
+                             "or DAMAGE_VALUES.large=20,30; repeat to sweep every combination")
+    parser.add_argument('--balance-ticks', type=int, metavar='TICKS',
+                        help="stop each balance game after TICKS ticks")
+    parser.add_argument('--workers', type=int, help="balance worker processes (default: all cores)")
+    parser.add_argument('--balance-report', metavar='FILE', help="write the balance report to a JSON file")
+    parser.add_argument('--progression', nargs='?', const='', metavar='FILE',
+                        help="print the per-level progression table compiled from GameConfig, "
+                             "and write it to a JSON file if given")
+    parser.add_argument('--levels', type=int,
+                        help=f"levels listed by --progression (default: {GameConfig.PROGRESSION_EXPORT_LEVELS})")
+    args = parser.parse_args()
+    if args.seed is not None:
+        GameConfig.RANDOM_SEED = args.seed
+    if args.record_input:
+        GameConfig.INPUT_LOG_PATH = args.record_input
+    if args.replay_input:
+        GameConfig.INPUT_REPLAY_PATH = args.replay_input
+        GameConfig.INPUT_BACKEND = 'intents'
+        GameConfig.HEADLESS_INPUT = 'intents'
+    if args.server_name:
+        GameConfig.HAND_SERVER_NAME = args.server_name
+    if args.roi:
+        GameConfig.ROI_TRACKING = True
+    if args.vision_metrics:
+        GameConfig.VISION_METRICS_PATH = args.vision_metrics
+    if args.record_landmarks:
+        GameConfig.LANDMARK_RECORD_PATH = args.record_landmarks
+    if args.replay_landmarks:
+        GameConfig.LANDMARK_REPLAY_PATH = args.replay_landmarks
+        GameConfig.INPUT_BACKEND = 'replay'
+        GameConfig.HEADLESS_INPUT = 'replay'
+    if args.input:
+        GameConfig.INPUT_BACKEND = args.input
+    if args.source is not None:
+        GameConfig.FRAME_SOURCE = args.source
+    if args.as_fast_as_possible:
+        GameConfig.FRAME_SOURCE_REALTIME = False
+    if args.latency_test is not None:
+        GameConfig.LATENCY_TEST = True
+        GameConfig.LATENCY_TEST_SECONDS = args.latency_test
+        GameConfig.LATENCY_REPORT_PATH = args.latency_report
+        GameConfig.INPUT_BACKEND = 'camera'
+        if args.source is None:
+            # 合成源没有真实的手，用圆盘检测代替mediapipe
+            GameConfig.FRAME_SOURCE = 'synthetic'
+            GameConfig.HAND_MODEL = 'marker'
+
+    if args.progression is not None:
+        print_progression_table(args.levels, args.progression or None)
+    elif args.benchmark_filters is not None:
+        benchmark_movement_filters(args.benchmark_filters or None)
+    elif args.hand_server:
+        run_hand_server()
+    elif args.balance is not None:
+        try:
+            grid = dict(parse_grid_option(option) for option in args.grid)
+        except (ValueError, SyntaxError) as e:
+            parser.error(str(e))
+        report = run_balance_sweep(grid, args.balance, args.balance_ticks, args.workers,
+                                   args.seed or 0)
+        print_balance_report(report, args.balance_report)
+    elif args.headless is not None:
+        print_simulation_report(Game(headless=True).simulate(args.headless, restart=args.soak))
+    else:
+        game = Game()
+        game.run()
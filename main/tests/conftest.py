@@ -0,0 +1,44 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 游戏脚本叫test.py，会和标准库的test包重名，按文件路径加载
+if 'bird_game' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('bird_game', os.path.join(GAME_DIR, 'test.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['bird_game'] = module
+    spec.loader.exec_module(module)
+
+import bird_game
+
+
+@pytest.fixture
+def config():
+    """Override GameConfig values for one test: config(NAME=value, ...)"""
+    previous = {}
+
+    def override(**values):
+        for name, value in bird_game.apply_config_overrides(values).items():
+            previous.setdefault(name, value)
+
+    yield override
+    bird_game.apply_config_overrides(previous)
+
+
+@pytest.fixture
+def headless_game(config, monkeypatch):
+    """Build a headless Game with GameConfig overrides, from the game directory"""
+    monkeypatch.chdir(GAME_DIR)
+
+    def build(**overrides):
+        config(**overrides)
+        return bird_game.Game(headless=True)
+
+    return build
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from bird_game import BotInput, GameConfig
+
+
+def bot_target(game, vel_x, dx=300.0):
+    game.pollution.count = 0
+    radius = GameConfig.BIRD_RADIUS
+    x, y = game.bird_pos[0] + radius, game.bird_pos[1] + radius
+    game.pollution.add('normal', (x + dx, y), (vel_x, 0.0), size=GameConfig.ENEMY_RADII['normal'],
+                       health=GameConfig.ENEMY_HEALTH['normal'])
+    with np.errstate(divide='raise', invalid='raise'):
+        intent = BotInput(game).poll()
+    assert np.all(np.isfinite(intent.target))
+    return intent.target[1] - game.bird_pos[1]
+
+
+def test_bot_dodges_incoming_enemies(headless_game):
+    game = headless_game(HEADLESS_INPUT='bot')
+    assert bot_target(game, -8.0, dx=120.0) != 0
+
+
+@pytest.mark.parametrize('vel_x', [0.0, 3.0])
+def test_bot_ignores_enemies_that_never_arrive(headless_game, vel_x):
+    game = headless_game(HEADLESS_INPUT='bot')
+    # 静止或远离的敌人不构成威胁，鸟留在原线路上
+    assert bot_target(game, vel_x, dx=120.0) == 0
+
+
+@pytest.mark.parametrize('vel_x', [0.0, 3.0, -8.0])
+def test_bot_dodges_enemies_already_touching(headless_game, vel_x):
+    game = headless_game(HEADLESS_INPUT='bot')
+    assert bot_target(game, vel_x, dx=10.0) != 0
@@ -0,0 +1,145 @@
+import math
+
+import numpy as np
+import pytest
+
+from bird_game import GameConfig, circle_hits
+
+BULLET_RADIUS = 15
+
+
+def old_bullet_hit(bullet, enemy, size, is_boss):
+    """The pairwise check_collision test that circle_hits replaced"""
+    if is_boss:
+        half_width, half_height = (side / 2 for side in GameConfig.BOSS_HITBOX_SIZE)
+        closest_x = max(enemy[0] - half_width, min(bullet[0], enemy[0] + half_width))
+        closest_y = max(enemy[1] - half_height, min(bullet[1], enemy[1] + half_height))
+        return math.sqrt((bullet[0] - closest_x) ** 2 + (bullet[1] - closest_y) ** 2) < BULLET_RADIUS
+    return math.sqrt((bullet[0] - enemy[0]) ** 2 + (bullet[1] - enemy[1]) ** 2) < size + BULLET_RADIUS
+
+
+def old_bullet_hits(bullets, enemies):
+    """The old per-enemy, per-bullet resolution loop, as (enemy, bullet) pairs"""
+    pairs = []
+    free = [True] * bullets.count
+    for i in range(enemies.count):
+        health = enemies.health[i]
+        is_boss = enemies.kind_name(i) == 'large'
+        for j in range(bullets.count):
+            if free[j] and old_bullet_hit(bullets.pos[j], enemies.pos[i], enemies.size[i], is_boss):
+                pairs.append((i, j))
+                free[j] = False
+                health -= bullets.power[j]
+                if health <= 0:
+                    break
+    return pairs
+
+
+@pytest.mark.parametrize('offset, hit', [
+    ((30, 40), False),   # 距离正好等于半径之和，不算命中
+    ((30, 39), True),
+    ((-50, 0), False),
+    ((-49.999, 0), True),
+])
+def test_circle_hits_at_the_radius_sum(offset, hit):
+    enemy = np.array([400.0, 300.0])
+    bullet = enemy + offset
+    assert bool(circle_hits(bullet, BULLET_RADIUS, enemy, 35.0, False)) is hit
+    assert old_bullet_hit(bullet, enemy, 35.0, False) is hit
+
+
+@pytest.mark.parametrize('offset, hit', [
+    ((36 + 15, 0), False),       # 贴着矩形右边
+    ((36 + 14, 0), True),
+    ((0, -(60 + 15)), False),    # 贴着矩形上边
+    ((36 + 9, 60 + 12), False),  # 到角点的距离正好是15
+    ((36 + 9, 60 + 11), True),
+    ((0, 0), True),
+])
+def test_circle_hits_boss_rectangle_edges(offset, hit):
+    enemy = np.array([400.0, 300.0])
+    bullet = enemy + offset
+    assert bool(circle_hits(bullet, BULLET_RADIUS, enemy, 36.0, True)) is hit
+    assert old_bullet_hit(bullet, enemy, 36.0, True) is hit
+
+
+def test_circle_hits_matches_pairwise_on_random_positions():
+    rng = np.random.default_rng(16)
+    # 整数坐标挤在小范围内，会出现很多正好相切的组合
+    bullets = rng.integers(0, 160, size=(300, 2)).astype(float)
+    enemies = rng.integers(0, 160, size=(40, 2)).astype(float)
+    sizes = rng.choice([30.0, 35.0, 36.0], size=40)
+    is_boss = rng.random(40) < 0.3
+    batched = circle_hits(bullets[:, None, :], BULLET_RADIUS, enemies[None, :, :],
+                          sizes[None, :], is_boss[None, :])
+    expected = np.array([[old_bullet_hit(b, e, s, boss) for e, s, boss in zip(enemies, sizes, is_boss)]
+                         for b in bullets])
+    assert expected.any() and not expected.all()
+    np.testing.assert_array_equal(batched, expected)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_find_bullet_hits_matches_old_resolution_loop(headless_game, seed):
+    game = headless_game(PIXEL_COLLISIONS=False, RANDOM_SEED=seed)
+    rng = np.random.default_rng(seed)
+    for _ in range(25):
+        kind = rng.choice(['normal', 'fast', 'large'])
+        # 包括刚从右边进入和已经移出画面的敌人
+        pos = (rng.uniform(-60, game.width + 60), rng.uniform(0, game.height))
+        game.pollution.add(kind, pos, size=GameConfig.ENEMY_RADII[kind],
+                           health=GameConfig.ENEMY_HEALTH[kind])
+    for _ in range(200):
+        pos = (rng.uniform(-20, game.width + 20), rng.uniform(-20, game.height + 20))
+        game.bullets.add('default', pos, power=int(rng.integers(1, 3)))
+    expected = old_bullet_hits(game.bullets, game.pollution)
+    assert len(expected) > 10
+    assert game.find_bullet_hits() == expected
+
+
+def brute_force_query(grid, pos, x0, y0, x1, y1):
+    """Every entity whose clamped cell lies inside the clamped box, one at a time"""
+    def clamp(value, last):
+        return min(max(int(value // grid.cell_size), 0), last)
+    cols = range(clamp(x0, grid.cols - 1), clamp(x1, grid.cols - 1) + 1)
+    rows = range(clamp(y0, grid.rows - 1), clamp(y1, grid.rows - 1) + 1)
+    return [i for i, (x, y) in enumerate(pos)
+            if clamp(x, grid.cols - 1) in cols and clamp(y, grid.rows - 1) in rows]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_spatial_grid_query_matches_brute_force(seed):
+    from bird_game import SpatialGrid
+    rng = np.random.default_rng(seed)
+    width, height, cell = 800, 600, 64
+    grid = SpatialGrid(width, height, cell)
+    # 一部分在画面外，会被夹到边上的格子里
+    pos = rng.uniform((-200, -200), (width + 200, height + 200), size=(400, 2))
+    grid.rebuild(pos)
+    boxes = [(-300, -300, -250, -250),               # 完全在左上角外面
+             (width + 10, height + 10, width + 99, height + 99),
+             (0, 0, width, height),                  # 整个画面
+             (-50, 100, 30, 500),                    # 跨过左边界
+             (cell * 3, cell * 2, cell * 3, cell * 2)]  # 正好落在格线上
+    for _ in range(50):
+        x0, y0 = rng.uniform((-150, -150), (width + 150, height + 150))
+        w, h = rng.uniform(0, 300, size=2)
+        boxes.append((x0, y0, x0 + w, y0 + h))
+    for box in boxes:
+        found = grid.query(*box)
+        assert np.all(np.diff(found) > 0)
+        assert found.tolist() == brute_force_query(grid, pos, *box)
+
+
+def test_spatial_grid_rebuild_reuses_and_grows_scratch():
+    from bird_game import SpatialGrid
+    grid = SpatialGrid(800, 600, 64)
+    grid.rebuild(np.array([[10.0, 10.0], [20.0, 20.0]]))
+    scratch = grid.scratch
+    grid.rebuild(np.array([[30.0, 30.0]]))
+    assert grid.scratch is scratch
+    assert grid.query(0, 0, 63, 63).tolist() == [0]
+    grid.rebuild(np.full((50, 2), 700.0))
+    assert len(grid.scratch) >= 50
+    assert grid.query(640, 640, 799, 599).tolist() == list(range(50))
+    grid.rebuild(np.zeros((0, 2)))
+    assert grid.query(0, 0, 800, 600).tolist() == []
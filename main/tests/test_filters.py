@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from bird_game import OneEuroFilter
+
+RATE = 60
+
+
+def run(filter, values, dt=1.0 / RATE):
+    # 滤波器返回的是内部状态数组，逐帧拷贝一份
+    return np.array([filter(value, i * dt).copy() for i, value in enumerate(values)])
+
+
+@pytest.mark.parametrize('beta', [0.0, 0.01, 1.0])
+def test_step_input_converges_without_overshoot(beta):
+    values = [(0.0, 0.0)] + [(100.0, -40.0)] * (5 * RATE)
+    out = run(OneEuroFilter(min_cutoff=1.0, beta=beta, rate=RATE), values)
+    np.testing.assert_allclose(out[-1], (100.0, -40.0), atol=1e-3)
+    assert np.all(np.diff(out[:, 0]) >= 0) and out[:, 0].max() <= 100.0
+    assert np.all(np.diff(out[:, 1]) <= 0) and out[:, 1].min() >= -40.0
+
+
+def test_higher_beta_lags_less_on_fast_movement():
+    values = [(i * 10.0,) for i in range(RATE)]
+    slow = run(OneEuroFilter(beta=0.0, rate=RATE), values)
+    fast = run(OneEuroFilter(beta=0.05, rate=RATE), values)
+    assert abs(fast[-1, 0] - values[-1][0]) < abs(slow[-1, 0] - values[-1][0])
+
+
+def test_zero_beta_is_a_fixed_low_pass():
+    rng = np.random.default_rng(6)
+    values = rng.uniform(-100, 100, size=(200, 2))
+    min_cutoff, dt = 2.0, 1.0 / RATE
+    out = run(OneEuroFilter(min_cutoff=min_cutoff, beta=0.0, rate=RATE), values)
+    # 截止频率不随速度变化，等价于固定系数的指数平滑
+    alpha = 1.0 / (1.0 + 1.0 / (2 * np.pi * min_cutoff) / dt)
+    expected = [values[0]]
+    for value in values[1:]:
+        expected.append(expected[-1] + alpha * (value - expected[-1]))
+    np.testing.assert_allclose(out, expected)
+
+
+def test_reset_restarts_from_the_next_sample():
+    filter = OneEuroFilter(rate=RATE)
+    run(filter, [(0.0, 0.0), (50.0, 50.0), (80.0, 20.0)])
+    filter.reset()
+    assert filter.value is None
+    np.testing.assert_array_equal(filter((300.0, 200.0), 10.0), (300.0, 200.0))
+
+
+def test_reset_to_a_value_filters_from_it():
+    filter = OneEuroFilter(beta=0.0, rate=RATE)
+    filter.reset((10.0, 10.0))
+    np.testing.assert_array_equal(filter.derivative, (0.0, 0.0))
+    reference = OneEuroFilter(beta=0.0, rate=RATE)
+    expected = run(reference, [(10.0, 10.0), (20.0, 0.0)])[-1]
+    # 重置后没有时间戳，第一步按1/rate计算
+    np.testing.assert_allclose(filter((20.0, 0.0), 123.0), expected)
+
+
+@pytest.mark.parametrize('repeat_dt', [0.0, -0.5])
+def test_non_positive_dt_falls_back_to_the_frame_rate(repeat_dt):
+    values = [(0.0,), (30.0,), (60.0,), (45.0,)]
+    expected = run(OneEuroFilter(rate=RATE), values)
+    filter = OneEuroFilter(rate=RATE)
+    timestamps = [5.0, 5.0 + repeat_dt, 5.0 + 2 * repeat_dt, 5.0 + 3 * repeat_dt]
+    out = np.array([filter(value, t).copy() for value, t in zip(values, timestamps)])
+    assert np.all(np.isfinite(out))
+    np.testing.assert_allclose(out, expected)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from bird_game import HandRoi, MarkerHandModel, detect_hands, index_tip_target
+
+WIDTH, HEIGHT = 320, 240
+
+
+class RecordingModel(MarkerHandModel):
+    """The marker detector, remembering the size of every image it was given"""
+    def __init__(self):
+        self.shapes = []
+
+    def process(self, frame):
+        self.shapes.append(frame.shape[:2])
+        return super().process(frame)
+
+
+def frame_with_hand(center=None, radius=12):
+    # 灰色背景，R和B相等；手用偏红的圆盘代替
+    frame = np.full((HEIGHT, WIDTH, 3), 100, dtype=np.uint8)
+    if center is not None:
+        ys, xs = np.ogrid[:HEIGHT, :WIDTH]
+        frame[(xs - center[0]) ** 2 + (ys - center[1]) ** 2 <= radius ** 2] = (220, 160, 120)
+    return frame
+
+
+def tip(hands):
+    assert len(hands) == 1
+    return hands[0][1][8]
+
+
+@pytest.mark.parametrize('center', [(200, 150), (20, 20), (300, 225), (160, 12)])
+def test_crop_landmarks_come_back_in_full_frame_coordinates(center):
+    model, roi = RecordingModel(), HandRoi(margin=0.5, min_size=96, full_frame_interval=15)
+    frame = frame_with_hand(center)
+    full = tip(detect_hands(model, frame))
+    first = tip(detect_hands(model, frame, roi))
+    cropped = tip(detect_hands(model, frame, roi))
+    # 第一次用整帧检测，之后只在框内推理
+    assert model.shapes[1] == (HEIGHT, WIDTH)
+    assert model.shapes[2][0] < HEIGHT and model.shapes[2][1] < WIDTH
+    np.testing.assert_allclose(full[:2], (center[0] / WIDTH, center[1] / HEIGHT), atol=1e-6)
+    np.testing.assert_allclose(first, full, atol=1e-6)
+    np.testing.assert_allclose(cropped, full, atol=1e-6)
+    # 映射到游戏坐标后仍落在左侧1/3区域，并与整帧结果一致
+    target = index_tip_target(cropped, 800, 600)
+    assert target == index_tip_target(full, 800, 600)
+    assert 30 <= target[0] <= 800 // 3 - 30
+
+
+def test_lost_hand_falls_back_to_the_full_frame():
+    model, roi = RecordingModel(), HandRoi(full_frame_interval=15)
+    detect_hands(model, frame_with_hand((200, 150)), roi)
+    assert roi.box is not None
+
+    # 手离开了框：框内没找到就立刻在整帧上重新检测
+    moved = tip(detect_hands(model, frame_with_hand((60, 60)), roi))
+    assert model.shapes[-2] != (HEIGHT, WIDTH) and model.shapes[-1] == (HEIGHT, WIDTH)
+    np.testing.assert_allclose(moved[:2], (60 / WIDTH, 60 / HEIGHT), atol=1e-6)
+    assert roi.box[0] <= 60 <= roi.box[2] and roi.box[1] <= 60 <= roi.box[3]
+
+    assert detect_hands(model, frame_with_hand(), roi) == []
+    assert model.shapes[-1] == (HEIGHT, WIDTH)
+    assert roi.box is None
+    detect_hands(model, frame_with_hand(), roi)
+    assert model.shapes[-1] == (HEIGHT, WIDTH)
+
+
+def test_full_frame_pass_every_interval():
+    model, roi = RecordingModel(), HandRoi(full_frame_interval=3)
+    frame = frame_with_hand((200, 150))
+    for _ in range(9):
+        assert len(detect_hands(model, frame, roi)) == 1
+    full = [shape == (HEIGHT, WIDTH) for shape in model.shapes]
+    assert full == [True, False, False, False, True, False, False, False, True]
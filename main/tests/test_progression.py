@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from bird_game import GameConfig, ProgressionTable
+
+LEVELS = range(1, 41)
+
+
+def old_level_values(level):
+    """The per-tick formulas of spawn_enemies, spawn_power_ups and the level-up check"""
+    weights = {
+        'normal': max(50 - level * 2, 20),
+        'fast': min(30 + level * 2, 50),
+        'large': min(20 + level, 30)
+    }
+    total_weight = sum(weights.values())
+    weights = {k: v / total_weight for k, v in weights.items()}
+    speed_bonus = 1 + (GameConfig.SPEED_INCREASE_PER_LEVEL * (level - 1))
+    power_up_interval = max(
+        GameConfig.MIN_POWER_UP_INTERVAL,
+        GameConfig.POWER_UP_BASE_INTERVAL - level * GameConfig.POWER_UP_INTERVAL_DECREASE
+    )
+    return {
+        'required_score': int(GameConfig.BASE_LEVEL_SCORE *
+                              (GameConfig.LEVEL_SCORE_MULTIPLIER ** (level - 1))),
+        'spawn_interval': max(GameConfig.MIN_SPAWN_INTERVAL, 50 - int(level * 1.5)),
+        'enemies_per_wave': min(4, 2 + (level - 1) // 4),
+        'weights': weights,
+        'enemy_speeds': {t: min((8 if t == 'fast' else 5) * speed_bonus, GameConfig.MAX_SPEED[t])
+                         for t in weights},
+        'power_up_interval': power_up_interval,
+        'low_health_power_up_interval': int(power_up_interval * (1 - GameConfig.LOW_HEALTH_BONUS_CHANCE)),
+        'invincibility_time': min(
+            GameConfig.BASE_INVINCIBILITY_TIME + level * GameConfig.INVINCIBILITY_INCREASE_PER_LEVEL,
+            GameConfig.MAX_INVINCIBILITY_TIME
+        ),
+    }
+
+
+def old_power_up_weights(health):
+    weights = {
+        'health': 10 if health < 30 else 5,
+        'shield': 6 if health < 40 else 3,
+        'rapid_fire': 20,
+        'triple_shot': 20,
+        'split_shot': 20
+    }
+    total_weight = sum(weights.values())
+    return {k: v / total_weight for k, v in weights.items()}
+
+
+def assert_same_draws(types, cum_weights, weights, seed):
+    # 同一个种子下，累积权重和旧的归一化权重抽出完全相同的序列
+    old_rng, new_rng = random.Random(seed), random.Random(seed)
+    old = [old_rng.choices(list(weights), weights=list(weights.values()))[0] for _ in range(500)]
+    new = [new_rng.choices(types, cum_weights=cum_weights)[0] for _ in range(500)]
+    assert new == old
+
+
+def check_levels(table):
+    for level in LEVELS:
+        stage, old = table[level], old_level_values(level)
+        assert stage.level == level
+        assert stage.required_score == old['required_score']
+        assert stage.spawn_interval == old['spawn_interval']
+        assert stage.enemies_per_wave == old['enemies_per_wave']
+        assert stage.enemy_speeds == old['enemy_speeds']
+        assert stage.power_up_interval == old['power_up_interval']
+        assert stage.low_health_power_up_interval == old['low_health_power_up_interval']
+        assert stage.invincibility_time == old['invincibility_time']
+        assert stage.enemy_types == tuple(old['weights'])
+        assert_same_draws(stage.enemy_types, stage.enemy_cum_weights, old['weights'], level)
+
+
+def test_levels_match_the_old_formulas():
+    check_levels(ProgressionTable())
+
+
+def test_levels_follow_config_overrides(config):
+    config(MIN_SPAWN_INTERVAL=30, SPEED_INCREASE_PER_LEVEL=0.2, BASE_LEVEL_SCORE=250,
+           MAX_INVINCIBILITY_TIME=90, MIN_POWER_UP_INTERVAL=400)
+    check_levels(ProgressionTable())
+
+
+@pytest.mark.parametrize('health', range(0, 101, 5))
+def test_power_up_weights_match_the_old_formulas(health):
+    types, cum_weights = ProgressionTable().power_ups_for(health)
+    weights = old_power_up_weights(health)
+    assert types == tuple(weights)
+    assert_same_draws(types, cum_weights, weights, health)
+
+
+def test_export_lists_the_compiled_levels():
+    table = ProgressionTable()
+    rows = table.export(10)['levels']
+    assert [row['level'] for row in rows] == list(range(1, 11))
+    for row in rows:
+        old = old_level_values(row['level'])
+        assert row['spawn_interval'] == old['spawn_interval']
+        assert row['enemy_weights'] == pytest.approx(old['weights'], abs=1e-4)